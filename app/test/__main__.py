@@ -1,7 +1,7 @@
 import pulumi
 import pulumi_cloudinit as cloud_init
 import yaml
-from pulumi import StackReference
+from pulumi import Output, StackReference
 import sys
 import pathlib
 
@@ -9,18 +9,54 @@ directory = pathlib.Path(__file__).resolve().parents[2]
 sys.path.append(directory.as_posix())
 
 import utils.basic as utils
-from utils.config_helpers import CreateVM
+from utils.config_helpers import (
+    CreateVM,
+    CreateVmGroup,
+    claim_floating_ips,
+    report_stats,
+)
+from utils.inventory import get_group_hosts, parse_inventory
+from utils.tags import register_stack_tags
 
 config = CreateVM.get_config()
 stack = CreateVM.get_stack_info().env_suffix
 org = CreateVM.get_org()
 
-inventory = config.require_object("inventory")
+register_stack_tags()
+
+inventory = parse_inventory(
+    config.require_object("inventory"), CreateVM.get_defaults()
+)
+groups = config.get_object("groups") or []
 
 networks_stackref = StackReference(f"{org}/infra.network/{stack}")
 keypair_stackref = StackReference(f"{org}/infra.keys/{stack}")
 default_sg_stackref = StackReference(f"{org}/infra.sg.default/{stack}")
 
+volumes_stackref = None
+if config.get_bool("base_volumes"):
+    volumes_stackref = StackReference(f"{org}/infra.volumes/{stack}")
+
+fip_claims = None
+if config.get_bool("fip_pool"):
+    fip_pool_stackref = StackReference(f"{org}/infra.fip_pool/{stack}")
+    nat_hosts = [x.host for x in inventory if x.nat]
+    nat_hosts.extend(
+        host
+        for group in groups
+        if group.get("nat")
+        for host in get_group_hosts(group)
+    )
+    # Own outputs of the last run hold the claims to keep
+    self_stackref = StackReference(
+        f"{org}/{pulumi.get_project()}/{pulumi.get_stack()}"
+    )
+    fip_claims = Output.all(
+        fip_pool_stackref.get_output("fips"),
+        self_stackref.get_output("fip_claims"),
+    ).apply(lambda args: claim_floating_ips(args[0], nat_hosts, args[1]))
+    pulumi.export("fip_claims", fip_claims)
+
 cloud_init_dict = yaml.load(
     utils.read_file("./cloud_init.yaml"),
     Loader=yaml.SafeLoader,
@@ -30,8 +66,9 @@ ssh_file = utils.get_ssh_public_key()
 if ssh_file:
     cloud_init_dict["users"][0]["ssh_authorized_keys"] = f"{ssh_file}"
 
+# Every instance keeps its own copy of user data in the checkpoint
 cloud_init_config = cloud_init.get_config(
-    gzip=False,
+    gzip=bool(config.get_bool("compress_user_data")),
     base64_encode=True,
     parts=[
         cloud_init.GetConfigPartArgs(
@@ -42,26 +79,37 @@ cloud_init_config = cloud_init.get_config(
     ],
 )
 
-instances_output = []
+instances_output = {}
 for item in inventory:
     instance = CreateVM(item)
     instance.create_stackrefs(
         network_stackref=networks_stackref,
         keypair_stackref=keypair_stackref if keypair_stackref else None,
         default_sg_stackref=default_sg_stackref,
+        volumes_stackref=volumes_stackref,
     )
     instance.set_user_data(cloud_init_config.rendered)
+    if fip_claims is not None:
+        instance.set_fip_claims(fip_claims)
     instance.run_all()
+    instances_output.update(instance.get_host_outputs())
+    instance.release()
 
-    output = {
-        "name": instance.vm.instance.name,
-        "address": instance.vm.instance.access_ip_v4,
-        "image": instance.vm.instance.image_name,
-        "nat": instance.vm_fip.fip.address if instance.vm_nat else None,
-        "network": instance.vm.instance.networks[0].name,
-    }
-
-    instances_output.append(output)
+for item in groups:
+    group = CreateVmGroup(item)
+    group.create_stackrefs(
+        network_stackref=networks_stackref,
+        keypair_stackref=keypair_stackref if keypair_stackref else None,
+        default_sg_stackref=default_sg_stackref,
+        volumes_stackref=volumes_stackref,
+    )
+    group.set_user_data(cloud_init_config.rendered)
+    if fip_claims is not None:
+        group.set_fip_claims(fip_claims)
+    group.run_all()
+    instances_output.update(group.get_host_outputs())
+    group.release()
 
 pulumi.export("instances", instances_output)
-pulumi.export("cloud-init", cloud_init_config.rendered)
+
+report_stats()
@@ -0,0 +1,142 @@
+import argparse
+import contextlib
+import json
+import os
+import pathlib
+import sys
+import time
+import uuid
+from typing import Any, Iterator
+
+import yaml
+
+directory = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(directory.as_posix())
+
+import utils.basic as utils
+from bench.fake_openstack import (
+    CONFIG_FILE,
+    get_provider_env,
+    load_config,
+    start,
+)
+from main import RunContext, run_stack
+from utils.history import HistoryStore
+from utils.report import RunSummary
+from utils.throttle import AdaptiveParallelism
+
+ROOT_DIR = directory.as_posix()
+STACKS_FILE = os.path.join(os.path.dirname(__file__), "stacks.yaml")
+ENV = "bench"
+
+
+def make_inventory(size: int) -> list[dict[str, Any]]:
+    return [{"host": f"bench-{i:03d}", "nat": i % 2 == 0} for i in range(size)]
+
+
+def load_stacks(hosts: int) -> dict[str, dict[str, Any]]:
+    with open(STACKS_FILE, "r") as f:
+        stacks = yaml.safe_load(f)
+    for config in stacks.values():
+        for key, value in config.items():
+            if value == "{hosts}":
+                config[key] = make_inventory(hosts)
+    return stacks
+
+
+@contextlib.contextmanager
+def stack_configs(stacks: dict[str, dict[str, Any]]) -> Iterator[list[str]]:
+    files = [
+        os.path.join(ROOT_DIR, work_dir, f"Pulumi.{ENV}.yaml")
+        for work_dir in stacks
+    ]
+    existing = [x for x in files if os.path.exists(x)]
+    if existing:
+        sys.exit(f"Refusing to overwrite {', '.join(existing)}")
+    try:
+        for filename, config in zip(files, stacks.values()):
+            with open(filename, "w") as f:
+                yaml.safe_dump({"config": config}, f, sort_keys=False)
+        yield [os.path.join(ROOT_DIR, x) for x in stacks]
+    finally:
+        for filename in files:
+            if os.path.exists(filename):
+                os.remove(filename)
+
+
+def run_action(
+    action: str,
+    work_dirs: list[str],
+    history: HistoryStore,
+    run_id: str,
+) -> float:
+    ctx = RunContext(
+        root_dir=ROOT_DIR,
+        env=ENV,
+        args=argparse.Namespace(action=action, inline=False, target_host=None),
+        plans=None,
+        governor=AdaptiveParallelism(),
+        summary=RunSummary(),
+        history=history,
+        run_id=run_id,
+    )
+    start_time = time.perf_counter()
+    for work_dir in work_dirs:
+        run_stack(ctx, work_dir)
+    seconds = time.perf_counter() - start_time
+    ctx.summary.print()
+    return seconds
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hosts", type=int, default=10, help="Inventory size")
+    parser.add_argument(
+        "--rounds", type=int, default=1, help="Up/destroy cycles"
+    )
+    parser.add_argument(
+        "--config", default=CONFIG_FILE, help="Fake cloud config"
+    )
+    parser.add_argument("--seed", type=int, help="Random seed for faults")
+    parser.add_argument(
+        "--keep",
+        action="store_true",
+        help="Skip destroy of the last round",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server, stop = start(load_config(args.config), seed=args.seed)
+    os.environ.update(get_provider_env(server.url))
+    os.environ.setdefault("PULUMI_CONFIG_PASSPHRASE", "")
+
+    history = HistoryStore(ROOT_DIR)
+    timings = []
+    try:
+        with stack_configs(load_stacks(args.hosts)) as work_dirs:
+            for i in range(args.rounds):
+                run_id = uuid.uuid4().hex
+                print(utils.make_header(f"UP round {i + 1}", ENV))
+                timing = {"up": run_action("up", work_dirs, history, run_id)}
+                if args.keep and i == args.rounds - 1:
+                    timings.append(timing)
+                    break
+                print(utils.make_header(f"DESTROY round {i + 1}", ENV))
+                timing["destroy"] = run_action(
+                    "destroy", work_dirs[::-1], history, run_id
+                )
+                timings.append(timing)
+    finally:
+        stop()
+
+    print(utils.make_header(f"BENCH {args.hosts} hosts", ENV))
+    for i, timing in enumerate(timings, 1):
+        line = " ".join(f"{k} {v:>8.1f}s" for k, v in timing.items())
+        print(f"round {i:>3} {line}")
+    print(json.dumps(server.get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,881 @@
+import argparse
+import ipaddress as ip
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+import yaml
+
+CONFIG_FILE = os.path.join(os.path.dirname(__file__), "fake_openstack.yaml")
+
+# Service -> path prefix, every endpoint is served by one listener
+PREFIXES = {
+    "identity": "/identity",
+    "compute": "/compute/v2.1",
+    "network": "/network",
+    "image": "/image",
+}
+
+# Collection -> (service, key of a single object in bodies)
+COLLECTIONS = {
+    "networks": ("network", "network"),
+    "subnets": ("network", "subnet"),
+    "ports": ("network", "port"),
+    "routers": ("network", "router"),
+    "security-groups": ("network", "security_group"),
+    "security-group-rules": ("network", "security_group_rule"),
+    "floatingips": ("network", "floatingip"),
+    "servers": ("compute", "server"),
+    "flavors": ("compute", "flavor"),
+    "os-keypairs": ("compute", "keypair"),
+    "os-server-groups": ("compute", "server_group"),
+    "images": ("image", None),
+}
+
+# Paging and sorting parameters never filter
+IGNORED_QUERY = {"limit", "marker", "sort", "sort_key", "sort_dir", "fields"}
+
+EXTENSIONS = [
+    "router",
+    "ext-gw-mode",
+    "security-group",
+    "port-security",
+    "standard-attr-tag",
+    "standard-attr-description",
+    "dns-integration",
+    "extraroute",
+    "allowed-address-pairs",
+    "binding",
+]
+
+
+@dataclass(frozen=True)
+class Faults:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: float = 0.0
+
+
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.rate, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def load_config(filename: str = CONFIG_FILE) -> dict[str, Any]:
+    with open(filename, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def get_faults(config: dict[str, Any]) -> dict[str, Faults]:
+    faults = config.get("faults") or {}
+    default = Faults(**(faults.get("default") or {}))
+    services = faults.get("services") or {}
+    return {
+        service: replace(default, **(services.get(service) or {}))
+        for service in PREFIXES
+    }
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FakeCloud:
+    def __init__(self, seed: dict[str, Any]):
+        self._lock = threading.RLock()
+        self.objects: dict[str, dict[str, dict[str, Any]]] = {
+            x: {} for x in COLLECTIONS
+        }
+        # Subnet id -> next host address index
+        self.allocated: dict[str, int] = Counter()
+        self.load_seed(seed)
+
+    def load_seed(self, seed: dict[str, Any]) -> None:
+        for flavor in seed.get("flavors") or []:
+            self.add("flavors", {"id": flavor["name"], **flavor})
+        for image in seed.get("images") or []:
+            self.add("images", image)
+        for net in seed.get("external_networks") or []:
+            network = self.add(
+                "networks", {"name": net["name"], "router:external": True}
+            )
+            self.add(
+                "subnets",
+                {
+                    "name": f"{net['name']}-subnet",
+                    "network_id": network["id"],
+                    "cidr": net["cidr"],
+                },
+            )
+        for router in seed.get("routers") or []:
+            external = self.find("networks", name=router["external_network"])
+            self.add(
+                "routers",
+                {
+                    "name": router["name"],
+                    "external_gateway_info": {"network_id": external["id"]},
+                },
+            )
+
+    def defaults(self, collection: str, obj: dict[str, Any]) -> dict[str, Any]:
+        common = {
+            "id": str(uuid.uuid4()),
+            "name": "",
+            "description": "",
+            "tags": [],
+            "tenant_id": "admin",
+            "project_id": "admin",
+            "created_at": now(),
+            "updated_at": now(),
+        }
+        extra: dict[str, Any] = {
+            "networks": {
+                "admin_state_up": True,
+                "status": "ACTIVE",
+                "subnets": [],
+                "shared": False,
+                "router:external": False,
+                "mtu": 1450,
+                "port_security_enabled": True,
+                "availability_zone_hints": [],
+            },
+            "subnets": {
+                "ip_version": 4,
+                "enable_dhcp": True,
+                "dns_nameservers": [],
+                "host_routes": [],
+                "allocation_pools": [],
+                "gateway_ip": None,
+            },
+            "ports": {
+                "admin_state_up": True,
+                "status": "ACTIVE",
+                "device_id": "",
+                "device_owner": "",
+                "fixed_ips": [],
+                "security_groups": [],
+                "allowed_address_pairs": [],
+                "mac_address": "fa:16:3e:%02x:%02x:%02x"
+                % tuple(random.randbytes(3)),
+            },
+            "routers": {
+                "admin_state_up": True,
+                "status": "ACTIVE",
+                "external_gateway_info": None,
+                "routes": [],
+            },
+            "security-groups": {"security_group_rules": [], "stateful": True},
+            "security-group-rules": {
+                "direction": "ingress",
+                "ethertype": "IPv4",
+                "protocol": None,
+                "port_range_min": None,
+                "port_range_max": None,
+                "remote_ip_prefix": None,
+                "remote_group_id": None,
+            },
+            "floatingips": {
+                "status": "DOWN",
+                "port_id": None,
+                "fixed_ip_address": None,
+                "router_id": None,
+            },
+            "servers": {
+                "status": "ACTIVE",
+                "addresses": {},
+                "metadata": {},
+                "accessIPv4": "",
+                "accessIPv6": "",
+                "OS-EXT-AZ:availability_zone": "nova",
+                "OS-EXT-STS:power_state": 1,
+                "os-extended-volumes:volumes_attached": [],
+                "user_id": "admin",
+                "links": [],
+            },
+            "flavors": {
+                "swap": "",
+                "rxtx_factor": 1.0,
+                "OS-FLV-EXT-DATA:ephemeral": 0,
+                "os-flavor-access:is_public": True,
+            },
+            "os-keypairs": {"type": "ssh", "fingerprint": "00:00"},
+            "os-server-groups": {"members": [], "metadata": {}},
+            "images": {
+                "status": "active",
+                "visibility": "public",
+                "container_format": "bare",
+                "disk_format": "qcow2",
+                "min_disk": 0,
+                "min_ram": 0,
+                "size": 1024,
+                "checksum": "0" * 32,
+                "properties": {},
+            },
+        }
+        return {**common, **extra[collection], **obj}
+
+    def add(self, collection: str, obj: dict[str, Any]) -> dict[str, Any]:
+        with self._lock:
+            obj = self.defaults(collection, obj)
+            self.objects[collection][obj["id"]] = obj
+            return obj
+
+    def find(self, collection: str, **filters: Any) -> dict[str, Any] | None:
+        return next(iter(self.list(collection, filters)), None)
+
+    def list(
+        self, collection: str, filters: dict[str, Any]
+    ) -> list[dict[str, Any]]:
+        with self._lock:
+            return [
+                obj
+                for obj in self.objects[collection].values()
+                if all(
+                    self.matches(obj, key, value)
+                    for key, value in filters.items()
+                    if key not in IGNORED_QUERY
+                )
+            ]
+
+    @staticmethod
+    def matches(obj: dict[str, Any], key: str, value: Any) -> bool:
+        if key not in obj:
+            return True
+        # Comma separated tags must all be present
+        if key == "tags":
+            return set(str(value).split(",")) <= set(obj["tags"])
+        return str(obj[key]).lower() == str(value).lower()
+
+    def get(self, collection: str, obj_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self.objects[collection].get(obj_id)
+
+    def delete(self, collection: str, obj_id: str) -> bool:
+        with self._lock:
+            return self.objects[collection].pop(obj_id, None) is not None
+
+    def allocate_ip(self, subnet: dict[str, Any], address: str | None) -> str:
+        if address:
+            return address
+        with self._lock:
+            hosts = ip.IPv4Network(subnet["cidr"]).hosts()
+            # First addresses are left to gateway and DHCP
+            self.allocated[subnet["id"]] += 1
+            for _ in range(self.allocated[subnet["id"]] + 9):
+                address = str(next(hosts))
+            return address  # type: ignore
+
+    def create_port(
+        self,
+        network_id: str,
+        device_id: str,
+        device_owner: str,
+        fixed_ip: str | None = None,
+        subnet_id: str | None = None,
+    ) -> dict[str, Any]:
+        subnet = (
+            self.get("subnets", subnet_id)
+            if subnet_id
+            else self.find("subnets", network_id=network_id)
+        )
+        fixed_ips = []
+        if subnet:
+            fixed_ips.append(
+                {
+                    "subnet_id": subnet["id"],
+                    "ip_address": self.allocate_ip(subnet, fixed_ip),
+                }
+            )
+        return self.add(
+            "ports",
+            {
+                "network_id": network_id,
+                "device_id": device_id,
+                "device_owner": device_owner,
+                "fixed_ips": fixed_ips,
+            },
+        )
+
+    # Hooks for objects that do more than store their body
+
+    def on_create(self, collection: str, obj: dict[str, Any]) -> None:
+        if collection == "subnets":
+            network = self.get("networks", obj["network_id"])
+            if network:
+                network["subnets"].append(obj["id"])
+            cidr = ip.IPv4Network(obj["cidr"])
+            if not obj["gateway_ip"]:
+                obj["gateway_ip"] = str(next(cidr.hosts()))
+        elif collection == "security-groups":
+            for ethertype in ["IPv4", "IPv6"]:
+                rule = self.add(
+                    "security-group-rules",
+                    {
+                        "security_group_id": obj["id"],
+                        "direction": "egress",
+                        "ethertype": ethertype,
+                    },
+                )
+                obj["security_group_rules"].append(rule)
+        elif collection == "floatingips":
+            subnet = self.find("subnets", network_id=obj["floating_network_id"])
+            obj["floating_ip_address"] = self.allocate_ip(
+                subnet, obj.get("floating_ip_address")  # type: ignore
+            )
+        elif collection == "servers":
+            self.boot_server(obj)
+
+    def boot_server(self, server: dict[str, Any]) -> None:
+        flavor = self.get("flavors", server.pop("flavorRef", ""))
+        server["flavor"] = {
+            "id": flavor["id"] if flavor else "",
+            "original_name": flavor["name"] if flavor else "",
+        }
+        server["image"] = {"id": server.pop("imageRef", "")}
+        server["security_groups"] = server.get("security_groups") or [
+            {"name": "default"}
+        ]
+        server["adminPass"] = "secret"
+        for net in server.pop("networks", None) or []:
+            network = self.get("networks", net.get("uuid", ""))
+            if network is None:
+                continue
+            port = self.create_port(
+                network["id"], server["id"], "compute:nova", net.get("fixed_ip")
+            )
+            server["addresses"].setdefault(network["name"], []).append(
+                {
+                    "addr": port["fixed_ips"][0]["ip_address"],
+                    "version": 4,
+                    "OS-EXT-IPS:type": "fixed",
+                    "OS-EXT-IPS-MAC:mac_addr": port["mac_address"],
+                }
+            )
+
+    def on_delete(self, collection: str, obj: dict[str, Any]) -> None:
+        if collection == "servers":
+            for port in self.list("ports", {"device_id": obj["id"]}):
+                for fip in self.list("floatingips", {"port_id": port["id"]}):
+                    fip.update(
+                        port_id=None, fixed_ip_address=None, status="DOWN"
+                    )
+                self.delete("ports", port["id"])
+        elif collection == "security-groups":
+            for rule in self.list(
+                "security-group-rules", {"security_group_id": obj["id"]}
+            ):
+                self.delete("security-group-rules", rule["id"])
+        elif collection == "security-group-rules":
+            group = self.get("security-groups", obj["security_group_id"])
+            if group:
+                group["security_group_rules"] = [
+                    x
+                    for x in group["security_group_rules"]
+                    if x["id"] != obj["id"]
+                ]
+        elif collection == "subnets":
+            network = self.get("networks", obj["network_id"])
+            if network:
+                network["subnets"].remove(obj["id"])
+
+    # Actions
+
+    def router_interface(
+        self, router_id: str, body: dict[str, Any], add: bool
+    ) -> dict[str, Any] | None:
+        router = self.get("routers", router_id)
+        if router is None:
+            return None
+        if add:
+            subnet = self.get("subnets", body.get("subnet_id", ""))
+            if subnet is None:
+                return None
+            port = self.create_port(
+                subnet["network_id"],
+                router_id,
+                "network:router_interface",
+                subnet["gateway_ip"],
+                subnet["id"],
+            )
+        else:
+            port = self.get("ports", body.get("port_id", "")) or next(
+                (
+                    x
+                    for x in self.list("ports", {"device_id": router_id})
+                    if any(
+                        y["subnet_id"] == body.get("subnet_id")
+                        for y in x["fixed_ips"]
+                    )
+                ),
+                None,
+            )
+            if port is None:
+                return None
+            self.delete("ports", port["id"])
+        return {
+            "id": router_id,
+            "port_id": port["id"],
+            "subnet_id": port["fixed_ips"][0]["subnet_id"],
+            "subnet_ids": [port["fixed_ips"][0]["subnet_id"]],
+            "tenant_id": "admin",
+        }
+
+    def server_action(self, server_id: str, body: dict[str, Any]) -> bool:
+        server = self.get("servers", server_id)
+        if server is None:
+            return False
+        if "addFloatingIp" in body or "removeFloatingIp" in body:
+            args = body.get("addFloatingIp") or body.get("removeFloatingIp")
+            fip = self.find("floatingips", floating_ip_address=args["address"])
+            if fip is None:
+                return False
+            if "addFloatingIp" in body:
+                port = self.find("ports", device_id=server_id)
+                fixed = (
+                    args.get("fixed_address")
+                    or port["fixed_ips"][0]["ip_address"]
+                )
+                fip.update(
+                    port_id=port["id"], fixed_ip_address=fixed, status="ACTIVE"
+                )
+            else:
+                fip.update(port_id=None, fixed_ip_address=None, status="DOWN")
+            self.sync_floating_addresses(server)
+        return True
+
+    def sync_floating_addresses(self, server: dict[str, Any]) -> None:
+        ports = {
+            x["id"]: x for x in self.list("ports", {"device_id": server["id"]})
+        }
+        for name, addresses in server["addresses"].items():
+            addresses[:] = [
+                x for x in addresses if x["OS-EXT-IPS:type"] != "floating"
+            ]
+        for fip in self.objects["floatingips"].values():
+            port = ports.get(fip["port_id"])
+            if port is None:
+                continue
+            network = self.get("networks", port["network_id"])
+            server["addresses"].setdefault(network["name"], []).append(  # type: ignore
+                {
+                    "addr": fip["floating_ip_address"],
+                    "version": 4,
+                    "OS-EXT-IPS:type": "floating",
+                    "OS-EXT-IPS-MAC:mac_addr": port["mac_address"],
+                }
+            )
+
+
+class FakeOpenStack(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        config: dict[str, Any],
+        seed: int | None = None,
+    ):
+        super().__init__(address, Handler)
+        self.cloud = FakeCloud(config.get("seed") or {})
+        self.faults = get_faults(config)
+        self.limiters = {
+            k: RateLimiter(v.rate_limit) for k, v in self.faults.items()
+        }
+        self.random = random.Random(seed)
+        self.stats: Counter[tuple[str, int]] = Counter()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, service: str, status: int) -> None:
+        with self._stats_lock:
+            self.stats[(service, status)] += 1
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        with self._stats_lock:
+            result: dict[str, dict[str, int]] = {}
+            for (service, status), count in sorted(self.stats.items()):
+                result.setdefault(service, {})[str(status)] = count
+            return result
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: FakeOpenStack
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self.handle_request("GET")
+
+    def do_POST(self) -> None:
+        self.handle_request("POST")
+
+    def do_PUT(self) -> None:
+        self.handle_request("PUT")
+
+    def do_PATCH(self) -> None:
+        self.handle_request("PATCH")
+
+    def do_DELETE(self) -> None:
+        self.handle_request("DELETE")
+
+    def get_service(self, path: str) -> tuple[str, str] | None:
+        for service, prefix in PREFIXES.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return service, path[len(prefix) :].rstrip("/")
+        return None
+
+    def send_json(
+        self,
+        status: int,
+        body: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        # Nova microversion negotiation
+        self.send_header("OpenStack-API-Version", "compute 2.79")
+        self.send_header("X-OpenStack-Nova-API-Version", "2.79")
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def handle_request(self, method: str) -> None:
+        url = urlsplit(self.path)
+        found = self.get_service(url.path)
+        body = self.read_body()
+        if found is None:
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+        service, path = found
+
+        faults = self.server.faults[service]
+        rand = self.server.random
+        time.sleep(faults.latency + rand.random() * faults.jitter)
+        if not self.server.limiters[service].allow():
+            status, result, headers = (
+                429,
+                {"message": "Rate limit exceeded"},
+                {"Retry-After": "1"},
+            )
+        elif faults.error_rate and rand.random() < faults.error_rate:
+            status, result, headers = 503, {"message": "Injected failure"}, {}
+        else:
+            query = dict(parse_qsl(url.query))
+            status, result, headers = self.dispatch(
+                service, method, path, query, body
+            )
+        self.server.record(service, status)
+        self.send_json(status, result, headers)
+
+    def dispatch(
+        self,
+        service: str,
+        method: str,
+        path: str,
+        query: dict[str, str],
+        body: dict[str, Any],
+    ) -> tuple[int, Any, dict[str, str]]:
+        cloud = self.server.cloud
+        base = self.server.url
+
+        if service == "identity":
+            return self.identity(method, path, base)
+
+        # Version documents
+        if path in {"", "/v2.0", "/v2"} and method == "GET":
+            return 200, self.versions(service, base), {}
+
+        if service == "network":
+            if not path.startswith("/v2.0/"):
+                return 404, {"error": path}, {}
+            path = path[len("/v2.0") :]
+            if path == "/extensions":
+                return (
+                    200,
+                    {
+                        "extensions": [
+                            {"alias": x, "name": x, "description": x}
+                            for x in EXTENSIONS
+                        ]
+                    },
+                    {},
+                )
+            match = re.fullmatch(
+                r"/routers/([^/]+)/(add|remove)_router_interface", path
+            )
+            if match and method == "PUT":
+                result = cloud.router_interface(
+                    match.group(1), body, match.group(2) == "add"
+                )
+                return (200, result, {}) if result else (404, {}, {})
+        elif service == "image":
+            if not path.startswith("/v2/"):
+                return 404, {"error": path}, {}
+            path = path[len("/v2") :]
+        elif service == "compute":
+            match = re.fullmatch(r"/servers/([^/]+)/action", path)
+            if match and method == "POST":
+                ok = cloud.server_action(match.group(1), body)
+                return (202, None, {}) if ok else (404, {}, {})
+            match = re.fullmatch(r"/servers/([^/]+)/os-interface", path)
+            if match:
+                ports = cloud.list("ports", {"device_id": match.group(1)})
+                return (
+                    200,
+                    {
+                        "interfaceAttachments": [
+                            {
+                                "port_id": x["id"],
+                                "net_id": x["network_id"],
+                                "mac_addr": x["mac_address"],
+                                "port_state": "ACTIVE",
+                                "fixed_ips": x["fixed_ips"],
+                            }
+                            for x in ports
+                        ]
+                    },
+                    {},
+                )
+            if re.fullmatch(r"/servers/[^/]+/os-volume_attachments", path):
+                return 200, {"volumeAttachments": []}, {}
+            if re.fullmatch(r"/flavors/[^/]+/os-extra_specs", path):
+                return 200, {"extra_specs": {}}, {}
+            if path in {"/servers/detail", "/flavors/detail"}:
+                path = path[: -len("/detail")]
+
+        return self.collection(method, path, query, body)
+
+    def collection(
+        self,
+        method: str,
+        path: str,
+        query: dict[str, str],
+        body: dict[str, Any],
+    ) -> tuple[int, Any, dict[str, str]]:
+        cloud = self.server.cloud
+        parts = path.strip("/").split("/")
+        name = parts[0]
+        if name not in COLLECTIONS or len(parts) > 2:
+            return 404, {"error": f"Not implemented: {method} {path}"}, {}
+        _, key = COLLECTIONS[name]
+
+        def wrap(obj: dict[str, Any]) -> Any:
+            return obj if key is None else {key: obj}
+
+        if len(parts) == 1:
+            if method == "GET":
+                items = cloud.list(name, query)
+                if name == "os-keypairs":
+                    return 200, {name[3:]: [{"keypair": x} for x in items]}, {}
+                return (
+                    200,
+                    {name.replace("-", "_").removeprefix("os_"): items},
+                    {},
+                )
+            if method == "POST":
+                data = body if key is None else body.get(key) or {}
+                if name == "os-keypairs":
+                    # Keypairs are addressed by name
+                    data = {"id": data["name"], **data}
+                obj = cloud.add(name, data)
+                cloud.on_create(name, obj)
+                status = 202 if name == "servers" else 201
+                return status, wrap(obj), {}
+            return 405, {}, {}
+
+        obj = cloud.get(name, parts[1])
+        if obj is None:
+            kind = key or "image"
+            return 404, {"itemNotFound": {"message": f"{kind} not found"}}, {}
+        if method == "GET":
+            return 200, wrap(obj), {}
+        if method in {"PUT", "PATCH"}:
+            data = body if key is None else body.get(key) or {}
+            obj.update(data, updated_at=now())
+            return 200, wrap(obj), {}
+        if method == "DELETE":
+            cloud.delete(name, obj["id"])
+            cloud.on_delete(name, obj)
+            return 204, None, {}
+        return 405, {}, {}
+
+    def versions(self, service: str, base: str) -> dict[str, Any]:
+        url = base + PREFIXES[service]
+        if service == "compute":
+            return {
+                "version": {
+                    "id": "v2.1",
+                    "status": "CURRENT",
+                    "version": "2.79",
+                    "min_version": "2.1",
+                    "links": [{"rel": "self", "href": url + "/"}],
+                }
+            }
+        version = {"network": "v2.0", "image": "v2.0"}[service]
+        return {
+            "versions": [
+                {
+                    "id": version,
+                    "status": "CURRENT",
+                    "links": [{"rel": "self", "href": f"{url}/{version[:2]}/"}],
+                }
+            ]
+        }
+
+    def identity(
+        self, method: str, path: str, base: str
+    ) -> tuple[int, Any, dict[str, str]]:
+        if path in {"", "/v3"} and method == "GET":
+            return (
+                200,
+                {
+                    "version": {
+                        "id": "v3.14",
+                        "status": "stable",
+                        "links": [
+                            {"rel": "self", "href": base + "/identity/v3/"}
+                        ],
+                    }
+                },
+                {},
+            )
+        if path == "/v3/auth/tokens" and method in {"POST", "GET"}:
+            token = uuid.uuid4().hex
+            status = 201 if method == "POST" else 200
+            return status, self.token_body(base), {"X-Subject-Token": token}
+        if path == "/v3/auth/tokens" and method in {"HEAD", "DELETE"}:
+            return 204, None, {}
+        return 404, {"error": path}, {}
+
+    def token_body(self, base: str) -> dict[str, Any]:
+        domain = {"id": "default", "name": "Default"}
+        catalog = []
+        for service, prefix in PREFIXES.items():
+            url = base + prefix + ("/v3" if service == "identity" else "")
+            catalog.append(
+                {
+                    "id": service,
+                    "name": service,
+                    "type": service,
+                    "endpoints": [
+                        {
+                            "id": f"{service}-{interface}",
+                            "interface": interface,
+                            "region": "RegionOne",
+                            "region_id": "RegionOne",
+                            "url": url,
+                        }
+                        for interface in ["public", "internal", "admin"]
+                    ],
+                }
+            )
+        issued = datetime.now(timezone.utc)
+        return {
+            "token": {
+                "methods": ["password"],
+                "issued_at": issued.strftime("%Y-%m-%dT%H:%M:%S.000000Z"),
+                "expires_at": (issued + timedelta(hours=12)).strftime(
+                    "%Y-%m-%dT%H:%M:%S.000000Z"
+                ),
+                "user": {"id": "admin", "name": "admin", "domain": domain},
+                "project": {"id": "admin", "name": "admin", "domain": domain},
+                "roles": [{"id": "admin", "name": "admin"}],
+                "catalog": catalog,
+            }
+        }
+
+
+def get_provider_env(url: str) -> dict[str, str]:
+    # Environment the openstack provider picks credentials from
+    return {
+        "OS_AUTH_URL": f"{url}/identity/v3",
+        "OS_USERNAME": "admin",
+        "OS_PASSWORD": "admin",
+        "OS_PROJECT_NAME": "admin",
+        "OS_USER_DOMAIN_NAME": "Default",
+        "OS_PROJECT_DOMAIN_NAME": "Default",
+        "OS_REGION_NAME": "RegionOne",
+        "OS_INTERFACE": "public",
+    }
+
+
+def start(
+    config: dict[str, Any], port: int = 0, seed: int | None = None
+) -> tuple[FakeOpenStack, Callable[[], None]]:
+    server = FakeOpenStack(("127.0.0.1", port), config, seed=seed)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop() -> None:
+        server.shutdown()
+        server.server_close()
+
+    return server, stop
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--config", default=CONFIG_FILE)
+    parser.add_argument("--seed", type=int, help="Random seed for faults")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    server = FakeOpenStack(
+        ("127.0.0.1", args.port), load_config(args.config), args.seed
+    )
+    for key, value in get_provider_env(server.url).items():
+        print(f"export {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(json.dumps(server.get_stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
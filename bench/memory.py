@@ -0,0 +1,81 @@
+import argparse
+import json
+import multiprocessing
+import os
+import pathlib
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+directory = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(directory.as_posix())
+
+from utils.validate import validate_stack
+
+WORK_DIR = os.path.join(directory, "app", "test")
+ENV = "bench"
+
+
+def make_inventory(size: int) -> list[dict[str, Any]]:
+    # Every other host gets a floating IP, like a typical fleet
+    return [{"host": f"bench-{i:05d}", "nat": i % 2 == 0} for i in range(size)]
+
+
+def measure(size: int) -> dict[str, Any]:
+    inventory = make_inventory(size)
+    tracemalloc.start()
+    start = time.perf_counter()
+    report = validate_stack(WORK_DIR, ENV, overrides={"inventory": inventory})
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "hosts": size,
+        "resources": len(report["resources"]),
+        "errors": report["errors"],
+        "seconds": round(seconds, 2),
+        "traced_peak_mb": round(peak / 2**20, 1),
+        # Kilobytes on Linux
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10, 1
+        ),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        help="Comma separated inventory sizes",
+        default="1000,10000,50000",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(x) for x in args.sizes.split(",")]
+
+    # Fresh interpreter per size, so peak RSS isn't inherited
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes:
+        with context.Pool(1) as pool:
+            result = pool.apply(measure, (size,))
+        results.append(result)
+        print(
+            f"{result['hosts']:>7} hosts {result['resources']:>7} resources"
+            f" {result['seconds']:>8.1f}s"
+            f" traced peak {result['traced_peak_mb']:>8.1f} MB"
+            f" max rss {result['max_rss_mb']:>8.1f} MB"
+        )
+        for error in result["errors"]:
+            print(f"  [{error['kind']}] {error['message']}")
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 # flake8: noqa
 from .config import Config
-from .fip import Fip, FipConfig
+from .fip import Fip, FipConfig, FipPool, FipPoolConfig
 from .instance import Vm, VmConfig
 from .network import Vpc, VpcConfig
 from .security_group import Sg, SgConfig, SgRuleConfig
+from .vm_group import VmGroup, VmGroupConfig
+from .volume import BaseVolumeEntry, BaseVolumes, BaseVolumesConfig
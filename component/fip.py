@@ -21,7 +21,9 @@ class FipConfig(BaseModel, validate_assignment=True):
         validate_default=True,
         default=None,
     )
-    pool: Output[str]
+    pool: Output[str] | str | None = None
+    # Address claimed from a pre-allocated pool, skips allocation
+    floating_ip: Output[str] | str | None = None
     instance_id: Output[str]
 
     @field_validator("fip_associate_name")
@@ -44,15 +46,21 @@ class Fip(ComponentResource):
     ):
         super().__init__("my:modules:fip", args.fip_name, None, opts)
 
-        self.fip_args = FloatingIpArgs(pool=args.pool)
-        self.fip = FloatingIp(
-            args.fip_name,
-            self.fip_args,
-            opts=ResourceOptions(parent=self),
-        )
+        if args.floating_ip is not None:
+            self.fip = None
+            self.address = Output.from_input(args.floating_ip)
+        else:
+            assert args.pool is not None, "Provide pool or floating_ip"
+            self.fip_args = FloatingIpArgs(pool=args.pool)
+            self.fip = FloatingIp(
+                args.fip_name,
+                self.fip_args,
+                opts=ResourceOptions(parent=self),
+            )
+            self.address = self.fip.address
 
         self.fip_associate_args = FloatingIpAssociateArgs(
-            floating_ip=self.fip.address,
+            floating_ip=self.address,
             instance_id=args.instance_id,
         )
         self.fip_associate = FloatingIpAssociate(
@@ -61,3 +69,42 @@ class Fip(ComponentResource):
         )
 
         self.register_outputs({})
+
+
+class FipPoolConfig(BaseModel, validate_assignment=True):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: str
+    pool: Output[str] | str
+    size: int = 0
+    # Hosts with a dedicated slot, stay stable on pool resize
+    hosts: list[str] = []
+
+
+class FipPool(ComponentResource):
+    def __init__(
+        self,
+        name: str,
+        args: FipPoolConfig,
+        opts=None,
+    ):
+        super().__init__("my:modules:fip-pool", name, None, opts)
+
+        slots = [f"host-{host}" for host in args.hosts]
+        slots.extend(f"spare-{i:03d}" for i in range(args.size))
+
+        self.fips: dict[str, FloatingIp] = {}
+        for slot in slots:
+            self.fips[slot] = FloatingIp(
+                f"{args.name}-{slot}",
+                FloatingIpArgs(pool=args.pool),
+                opts=ResourceOptions(parent=self),
+            )
+
+        self.register_outputs({})
+
+    def get_output(self) -> dict[str, dict[str, Output[str]]]:
+        return {
+            slot: {"id": fip.id, "address": fip.address}
+            for slot, fip in self.fips.items()
+        }
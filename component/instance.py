@@ -1,5 +1,6 @@
 from pulumi import ComponentResource, Output, ResourceOptions
 from pulumi_cloudinit.get_config import AwaitableGetConfigResult
+from pulumi_openstack.blockstorage import Volume
 from pulumi_openstack.compute import (
     Instance,
     InstanceNetworkArgs,
@@ -15,6 +16,9 @@ class VmConfig(BaseModel, validate_assignment=True):
     flavor_id: str
     image_id: str
     boot_volume: int | None = None
+    # Base volume to clone the boot volume from, resolving
+    # to None falls back to copying the image
+    base_volume_id: Output[str | None] | str | None = None
     key_pair: Output[str] | None = None
     security_groups: list[Output[str]]
     internal_net_id: Output[str] | str
@@ -32,7 +36,13 @@ class Vm(ComponentResource):
         opts=None,
     ):
         super().__init__("my:modules:instance", name, None, opts)
-        params = self.create_instance_params(args)
+
+        self.boot_volume = None
+        if args.boot_volume and args.base_volume_id is not None:
+            self.boot_volume = self.create_boot_volume(name, args, self)
+        params = self.create_instance_params(
+            args, self.boot_volume.id if self.boot_volume else None
+        )
 
         self.instance = Instance(
             name,
@@ -46,7 +56,43 @@ class Vm(ComponentResource):
 
         self.register_outputs({})
 
-    def create_instance_params(self, args: VmConfig):
+    @staticmethod
+    def create_boot_volume(
+        name: str, args: VmConfig, parent: ComponentResource
+    ) -> Volume:
+        volume_name = f"{name}-boot"
+        image_id = Output.from_input(args.base_volume_id).apply(
+            lambda base_id, image_id=args.image_id: (
+                None if base_id else image_id
+            )
+        )
+        return Volume(
+            volume_name,
+            name=volume_name,
+            size=args.boot_volume,
+            source_vol_id=args.base_volume_id,
+            image_id=image_id,
+            opts=ResourceOptions(parent=parent),
+        )
+
+    @staticmethod
+    def create_volume_block_devices(
+        volume_id: Output[str],
+    ) -> list[InstanceBlockDeviceArgs]:
+        # Volume is owned by the stack, not by Nova
+        boot_volume = InstanceBlockDeviceArgs(
+            uuid=volume_id,
+            source_type="volume",
+            boot_index=0,
+            delete_on_termination=False,
+            destination_type="volume",
+        )
+        return [boot_volume]
+
+    @staticmethod
+    def create_instance_params(
+        args: VmConfig, boot_volume_id: Output[str] | None = None
+    ):
         primary_network_args = InstanceNetworkArgs(
             access_network=args.access_network,
             uuid=args.internal_net_id,
@@ -74,7 +120,11 @@ class Vm(ComponentResource):
         if args.key_pair:
             params["key_pair"] = args.key_pair
 
-        if args.boot_volume:
+        if boot_volume_id is not None:
+            params["block_devices"] = Vm.create_volume_block_devices(
+                boot_volume_id
+            )
+        elif args.boot_volume:
             boot_volume = InstanceBlockDeviceArgs(
                 uuid=args.image_id,
                 source_type="image",
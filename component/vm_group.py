@@ -0,0 +1,83 @@
+from pulumi import ComponentResource, ResourceOptions
+from pulumi_openstack.blockstorage import Volume
+from pulumi_openstack.compute import (
+    Instance,
+    InstanceSchedulerHintArgs,
+    ServerGroup,
+)
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from .instance import Vm, VmConfig
+
+
+class VmGroupConfig(BaseModel, validate_assignment=True):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: str
+    template: VmConfig
+    hosts: list[str]
+    # Resource name of every member is prefix + host
+    name_prefix: str = ""
+    # anti-affinity, soft-anti-affinity, affinity, soft-affinity
+    server_group_policy: str | None = None
+
+    @field_validator("hosts")
+    @classmethod
+    def check_hosts(cls, v: list[str]) -> list[str]:
+        assert len(v) == len(set(v)), "Group host names must be unique"
+        return v
+
+
+class VmGroup(ComponentResource):
+    def __init__(
+        self,
+        name: str,
+        args: VmGroupConfig,
+        opts=None,
+    ):
+        super().__init__("my:modules:instance-group", name, None, opts)
+
+        # Shared by every member, including security group,
+        # key pair and user data outputs
+        params = Vm.create_instance_params(args.template)
+
+        self.server_group = None
+        if args.server_group_policy:
+            self.server_group = ServerGroup(
+                f"{name}-server-group",
+                name=f"{name}-server-group",
+                policies=[args.server_group_policy],
+                opts=ResourceOptions(parent=self),
+            )
+            params["scheduler_hints"] = [
+                InstanceSchedulerHintArgs(group=self.server_group.id)
+            ]
+
+        template = args.template
+        clone_volumes = bool(template.boot_volume) and (
+            template.base_volume_id is not None
+        )
+
+        self.boot_volumes: dict[str, Volume] = {}
+        self.instances: dict[str, Instance] = {}
+        for host in args.hosts:
+            instance_name = f"{args.name_prefix}{host}"
+            host_params = params
+            if clone_volumes:
+                volume = Vm.create_boot_volume(instance_name, template, self)
+                self.boot_volumes[host] = volume
+                host_params = {
+                    **params,
+                    "block_devices": Vm.create_volume_block_devices(volume.id),
+                }
+            self.instances[host] = Instance(
+                instance_name,
+                **host_params,
+                name=instance_name,
+                opts=ResourceOptions(
+                    parent=self,
+                    ignore_changes=["image_id", "user_data"],
+                ),
+            )
+
+        self.register_outputs({})
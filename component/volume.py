@@ -0,0 +1,50 @@
+from pulumi import ComponentResource, Output, ResourceOptions
+from pulumi_openstack.blockstorage import Volume
+from pydantic import BaseModel, ConfigDict
+
+
+class BaseVolumeEntry(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    image: str
+    image_id: Output[str] | str
+    size: int
+
+
+class BaseVolumesConfig(BaseModel, validate_assignment=True):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: str
+    volumes: list[BaseVolumeEntry]
+    # Type whose backend clones copy-on-write, e.g. ceph rbd
+    volume_type: str | None = None
+
+
+class BaseVolumes(ComponentResource):
+    def __init__(
+        self,
+        name: str,
+        args: BaseVolumesConfig,
+        opts=None,
+    ):
+        super().__init__("my:modules:base-volumes", name, None, opts)
+
+        self.volumes: dict[str, Volume] = {}
+        for entry in args.volumes:
+            volume_name = f"{args.name}-{entry.image}"
+            self.volumes[entry.image] = Volume(
+                volume_name,
+                name=volume_name,
+                image_id=entry.image_id,
+                size=entry.size,
+                volume_type=args.volume_type,
+                opts=ResourceOptions(parent=self),
+            )
+
+        self.register_outputs({})
+
+    def get_output(self) -> dict[str, dict[str, Output]]:
+        return {
+            image: {"id": volume.id, "size": volume.size}
+            for image, volume in self.volumes.items()
+        }
@@ -0,0 +1,27 @@
+import pulumi
+import sys
+import pathlib
+
+directory = pathlib.Path(__file__).resolve().parents[2]
+sys.path.append(directory.as_posix())
+
+import component
+from utils.tags import register_stack_tags
+
+config = component.Config()
+stack_info = config.parse_stack()
+stack = stack_info.env_suffix
+
+register_stack_tags()
+
+pool_name = f"{stack}-fip-pool"
+pool_args = component.FipPoolConfig(
+    name=pool_name,
+    pool=config.require("external_network"),
+    size=config.get_int("size") or 0,
+    hosts=config.get_object("hosts") or [],
+)
+
+pool = component.FipPool(pool_name, args=pool_args)
+
+pulumi.export("fips", pool.get_output())
@@ -10,11 +10,14 @@ sys.path.append(directory.as_posix())
 
 import component
 from utils.basic import get_ssh_public_key
+from utils.tags import register_stack_tags
 
 config = component.Config()
 stack_info = config.parse_stack()
 stack = stack_info.env_suffix
 
+register_stack_tags()
+
 home_key = config.get_bool("home_key")
 
 if home_key:
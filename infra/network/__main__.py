@@ -7,10 +7,13 @@ sys.path.append(directory.as_posix())
 
 import component
 import utils.config_helpers as helper
+from utils.tags import register_stack_tags
 
 config = component.Config()
 stack_info = config.parse_stack()
 
+register_stack_tags()
+
 networks = config.require_object("networks")
 external_network = helper.get_network_by_name(
     config.require("external_network")
@@ -21,8 +24,9 @@ default_dns = config.get_object("default_dns")
 if default_dns is None or not isinstance(default_dns, list) or not default_dns:
     default_dns = []
 
-networks_output = []
+networks_output = {}
 for net in networks:
+    net_name = net["name"]
     network_admin_state = net.get("network_admin_state_up")
     dns = net.get("dns", default_dns)
     dhcp = net.get("dhcp")
@@ -32,7 +36,7 @@ for net in networks:
     if router_name is None:
         router_name = default_router.name
 
-    network_name = f"{stack_info.env_suffix}-{net['name']}"
+    network_name = f"{stack_info.env_suffix}-{net_name}"
     subnet_name = f"{network_name}-subnet"
     network_args = component.VpcConfig(
         network_name=network_name,
@@ -51,21 +55,14 @@ for net in networks:
 
     net = component.Vpc(network_name, args=network_args)
 
-    output = {
-        "network_id": net.network.id,
-        "admin_state_up": net.network.admin_state_up,
-        "name": net.network.name,
-        "subnet": {
-            "name": net.subnet.name,
-            "id": net.subnet.id,
-            "cidr": net.subnet.cidr,
-            "dns": net.subnet.dns_nameservers,
-            "dhcp": net.subnet.enable_dhcp,
-            "dhcp_pool": net.subnet.allocation_pools[0],
-        },
+    # Keyed by config name, consumers look networks up by it
+    networks_output[net_name] = {
+        "id": net.network.id,
+        "subnet_id": net.subnet.id,
+        "cidr": net.subnet.cidr,
     }
 
-    networks_output.append(output)
-
 pulumi.export("networks", networks_output)
 pulumi.export("external_network_name", external_network.name)
+
+helper.report_stats()
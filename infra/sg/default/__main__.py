@@ -7,11 +7,14 @@ sys.path.append(directory.as_posix())
 
 import component
 import utils.config_helpers as helper
+from utils.tags import register_stack_tags
 
 config = component.Config()
 stack_info = config.parse_stack()
 stack = stack_info.env_suffix
 
+register_stack_tags()
+
 service_name = f"{stack}-sg-default"
 
 sg_rules = config.get_object(
@@ -34,3 +37,5 @@ sg_args = helper.CreateSgConfig(
 sg = component.Sg(service_name, args=sg_args)
 
 pulumi.export("sg", sg)
+
+helper.report_stats()
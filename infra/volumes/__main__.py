@@ -0,0 +1,44 @@
+import pulumi
+import sys
+import pathlib
+
+directory = pathlib.Path(__file__).resolve().parents[2]
+sys.path.append(directory.as_posix())
+
+import component
+import utils.config_helpers as helper
+from utils.tags import register_stack_tags
+
+config = component.Config()
+stack_info = config.parse_stack()
+stack = stack_info.env_suffix
+
+register_stack_tags()
+
+images = config.get_object("images") or []
+
+volumes_name = f"{stack}-base-volume"
+volumes = []
+for item in images:
+    image = helper.get_image_by_name(item["name"])
+    assert image
+    volumes.append(
+        component.BaseVolumeEntry(
+            image=item["name"], image_id=image.id, size=item["size"]
+        )
+    )
+
+# Nothing to keep until images are configured
+base_volumes_output = {}
+if volumes:
+    volumes_args = component.BaseVolumesConfig(
+        name=volumes_name,
+        volumes=volumes,
+        volume_type=config.get("volume_type"),
+    )
+    base_volumes = component.BaseVolumes(volumes_name, args=volumes_args)
+    base_volumes_output = base_volumes.get_output()
+
+pulumi.export("volumes", base_volumes_output)
+
+helper.report_stats()
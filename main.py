@@ -1,5 +1,48 @@
+import json
 import os
+import sys
+import uuid
+from dataclasses import dataclass
+from typing import Any
 import utils.basic as utils
+import utils.inline as inline
+from utils.adopt import adopt_all, connect, format_adopt
+from utils.drift import detect_drift, format_drift, has_drift
+from utils.fanout import (
+    capture_stdout,
+    env_output,
+    find_envs,
+    get_waves,
+    run_waves,
+)
+from utils.history import (
+    HistoryStore,
+    StackRecord,
+    format_regressions,
+    timed,
+)
+from utils.journal import JournalError, RunJournal
+from utils.preflight import run_preflight
+from utils.preview import PreviewCollector, PreviewReport
+from utils.plan import (
+    PlanMismatchError,
+    PlanStore,
+    get_project_name,
+    get_run_dir,
+)
+from utils.report import RunSummary, chain_events
+from utils.state import format_state, report_state
+from utils.sweep import format_sweep, get_state_ids, sweep
+from utils.tags import get_stack_tag
+from utils.targets import resolve_targets
+from utils.throttle import AdaptiveParallelism, StackLimits
+from utils.watch import watch
+from utils.validate import (
+    find_ip_conflicts,
+    format_report,
+    read_project_name,
+    validate_all,
+)
 
 from pulumi import automation as auto
 import argparse
@@ -12,39 +55,401 @@ def parse_args() -> argparse.Namespace:
         "env": "dev",
     }
     parser.set_defaults(**defaults)
-    parser.add_argument("--env", "-e", help="Environment name")
+    parser.add_argument(
+        "--env",
+        "-e",
+        help=(
+            "Environment names, comma separated,"
+            " globs match Pulumi.<env>.yaml"
+        ),
+    )
     parser.add_argument(
         "--action",
         "-a",
         help="Ation to perform",
-        choices=["up", "destroy", "preview"],
+        choices=[
+            "up",
+            "destroy",
+            "preview",
+            "validate",
+            "history",
+            "drift",
+            "adopt",
+            "state-report",
+        ],
     )
     parser.add_argument(
         "--infra-only",
         help="Run only infrastructure",
         action=argparse.BooleanOptionalAction,
     )
+    parser.add_argument(
+        "--watch",
+        help="Re-run preview of stacks affected by file changes",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--inline",
+        help="Run stack programs inline in one shared interpreter",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--plan",
+        help="Save update plans on preview and apply them on up",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--target-host",
+        help="Limit the run to resources of comma separated inventory hosts",
+        type=lambda x: [h.strip() for h in x.split(",") if h.strip()],
+    )
+    parser.add_argument(
+        "--fast-destroy",
+        help="Bulk delete tagged resources before destroy",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--resume",
+        help="Continue the last up/destroy, skipping stacks it completed",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--dry-run",
+        help="Adopt: only write import specs, don't import",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--wave",
+        help="Run comma separated env patterns as waves, stop on failure",
+        action=argparse.BooleanOptionalAction,
+    )
+    parser.add_argument(
+        "--max-envs",
+        help="Maximum number of environments of a wave running at once",
+        type=int,
+    )
+    parser.add_argument(
+        "--preflight",
+        help="Validate config of every stack before running any of them",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+    )
+    parser.add_argument(
+        "--window",
+        help="History: number of previous runs in the baseline",
+        type=int,
+        default=10,
+    )
+    parser.add_argument(
+        "--threshold",
+        help="History: flag runs slower than baseline times this",
+        type=float,
+        default=1.5,
+    )
     args = parser.parse_args()
+    if args.watch and args.action != "preview":
+        parser.error("--watch works only with preview action")
+    if args.watch and args.inline:
+        # Changed modules would not be reloaded in the shared interpreter
+        parser.error("--watch can't be used with --inline")
+    if args.target_host and args.action not in ["up", "preview", "destroy"]:
+        parser.error("--target-host works only with up, preview and destroy")
+    if args.resume and args.action not in ["up", "destroy"]:
+        parser.error("--resume works only with up and destroy")
+    if args.fast_destroy and args.action != "destroy":
+        parser.error("--fast-destroy works only with destroy action")
+    if args.fast_destroy and args.target_host:
+        # Sweep deletes everything tagged by the stack
+        parser.error("--fast-destroy can't be used with --target-host")
+    if args.inline:
+        # Inline programs share one interpreter and its cwd
+        if args.max_envs and args.max_envs > 1:
+            print(
+                "--inline runs one environment at a time,"
+                f" ignoring --max-envs {args.max_envs}"
+            )
+        args.max_envs = 1
     return args
 
 
-def run_preview(stack: auto.Stack) -> None:
+def run_preview(
+    stack: auto.Stack,
+    plan: str | None = None,
+    parallel: int | None = None,
+    on_event: auto.OnEvent | None = None,
+    timings: dict[str, float] | None = None,
+    targets: list[str] | None = None,
+) -> auto.PreviewResult:
     header = utils.make_header("PREVIEW", stack.workspace.work_dir)
     print(header)
-    stack.preview(on_output=print)
+    with timed(timings, "preview"):
+        return stack.preview(
+            on_output=print,
+            plan=plan,
+            parallel=parallel,
+            on_event=on_event,
+            target=targets,
+            target_dependents=bool(targets),
+        )
 
 
-def run_destroy(stack: auto.Stack) -> None:
+def run_destroy(
+    stack: auto.Stack,
+    parallel: int | None = None,
+    on_event: auto.OnEvent | None = None,
+    timings: dict[str, float] | None = None,
+    targets: list[str] | None = None,
+    refresh: bool = False,
+) -> None:
     header = utils.make_header("DESTROY", stack.workspace.work_dir)
     print(header)
-    stack.destroy(on_output=print)
+    # Drops resources deleted outside of the engine from state
+    if refresh:
+        with timed(timings, "refresh"):
+            stack.refresh(parallel=parallel, on_event=on_event)
+    with timed(timings, "destroy"):
+        stack.destroy(
+            on_output=print,
+            parallel=parallel,
+            on_event=on_event,
+            target=targets,
+            target_dependents=bool(targets),
+        )
 
 
-def run_up(stack: auto.Stack) -> None:
+def run_up(
+    stack: auto.Stack,
+    plan: str | None = None,
+    parallel: int | None = None,
+    on_event: auto.OnEvent | None = None,
+    timings: dict[str, float] | None = None,
+    targets: list[str] | None = None,
+    state_targets: list[str] | None = None,
+) -> None:
     header = utils.make_header("CREATE", stack.workspace.work_dir)
     print(header)
-    stack.refresh()
-    stack.up(on_output=print)
+    # Saved plan was computed against the current state,
+    # so refresh here would invalidate it.
+    # Targeted refresh is limited to resources already in state
+    if plan is None and (targets is None or state_targets):
+        with timed(timings, "refresh"):
+            stack.refresh(
+                parallel=parallel, on_event=on_event, target=state_targets
+            )
+    with timed(timings, "up"):
+        stack.up(
+            on_output=print,
+            plan=plan,
+            parallel=parallel,
+            on_event=on_event,
+            target=targets,
+            target_dependents=bool(targets),
+        )
+
+
+def run_validate(root_dir: str, work_dirs: list[str], env: str) -> bool:
+    header = utils.make_header("VALIDATE", root_dir)
+    print(header)
+    reports = validate_all(work_dirs, env)
+    for report in reports:
+        print(format_report(report))
+
+    conflicts = find_ip_conflicts(reports)
+    for conflict in conflicts:
+        print(f"IP conflict: {conflict}")
+
+    report_file = os.path.join(get_run_dir(root_dir, "validate"), f"{env}.json")
+    with open(report_file, "w") as f:
+        json.dump(reports, f, indent=2)
+
+    return not conflicts and not any(x["errors"] for x in reports)
+
+
+def run_drift(root_dir: str, work_dirs: list[str], env: str) -> bool:
+    header = utils.make_header("DRIFT", env)
+    print(header)
+    reports = detect_drift(root_dir, work_dirs, env)
+    print(format_drift(reports))
+
+    report_file = os.path.join(get_run_dir(root_dir, "drift"), f"{env}.json")
+    with open(report_file, "w") as f:
+        json.dump(reports, f, indent=2, default=str)
+
+    return not has_drift(reports)
+
+
+def run_state_report(root_dir: str, work_dirs: list[str], env: str) -> bool:
+    header = utils.make_header("STATE", env)
+    print(header)
+    reports = report_state(root_dir, work_dirs, env)
+    print(format_state(reports))
+
+    report_file = os.path.join(get_run_dir(root_dir, "state"), f"{env}.json")
+    with open(report_file, "w") as f:
+        json.dump(reports, f, indent=2)
+
+    return not any(x["error"] for x in reports)
+
+
+def run_adopt(
+    root_dir: str, work_dirs: list[str], env: str, apply: bool
+) -> bool:
+    header = utils.make_header("ADOPT", env)
+    print(header)
+    try:
+        reports = adopt_all(root_dir, work_dirs, env, apply)
+    except RuntimeError as e:
+        print(e)
+        return False
+    print(format_adopt(reports))
+    return not any(x["errors"] for x in reports)
+
+
+@dataclass
+class RunContext:
+    root_dir: str
+    env: str
+    args: argparse.Namespace
+    plans: PlanStore | None
+    # Shared by all stacks of the env as they hit the same OpenStack API
+    governor: AdaptiveParallelism
+    summary: RunSummary
+    history: HistoryStore
+    run_id: str
+    previews: PreviewReport | None = None
+    # OpenStack connection for --fast-destroy
+    cloud: Any = None
+    journal: RunJournal | None = None
+
+
+def run_stack(ctx: RunContext, work_dir: str) -> None:
+    args = ctx.args
+    action = args.action
+    plans = ctx.plans
+    project = get_project_name(ctx.root_dir, work_dir)
+    record = StackRecord(project, action)
+
+    journal = ctx.journal
+    if journal and journal.is_done(work_dir):
+        print(f"{project} completed in run {journal.resumed_from}, skipping")
+        journal.update(work_dir, "succeeded")
+        return
+    if journal:
+        journal.update(work_dir, "running")
+
+    try:
+        if args.inline:
+            stack = inline.create_or_select_stack(ctx.env, work_dir)
+        else:
+            stack = auto.create_or_select_stack(
+                stack_name=ctx.env, work_dir=work_dir
+            )
+        ceiling = StackLimits.from_config(work_dir, ctx.env).ceiling(stack)
+        on_stack_event = chain_events(
+            ctx.summary.collector(project), record.on_event
+        )
+
+        targets = state_targets = None
+        if args.target_host:
+            targets, state_targets = resolve_targets(
+                stack, work_dir, ctx.env, args.target_host
+            )
+            # Destroy can only target what exists
+            if action == "destroy":
+                targets = state_targets
+            if not targets:
+                print(f"No resources of {args.target_host} in {project}")
+                record.status = "skipped"
+                return
+
+        if action == "preview":
+            plan = plans.prepare(work_dir) if plans else None
+            steps = PreviewCollector()
+
+            def preview(parallel: int, on_event: auto.OnEvent):
+                # Steps of a throttled attempt are previewed again
+                steps.reset()
+                return run_preview(
+                    stack,
+                    plan,
+                    parallel=parallel,
+                    on_event=chain_events(
+                        on_event, on_stack_event, steps.on_event
+                    ),
+                    timings=record.phases,
+                    targets=targets,
+                )
+
+            result = ctx.governor.run(ceiling, preview)
+            if plans:
+                plans.save(work_dir)
+            if ctx.previews:
+                ctx.previews.add(project, result.change_summary, steps)
+        elif action == "destroy":
+            swept = False
+            if ctx.cloud is not None:
+                tag = get_stack_tag(read_project_name(work_dir), ctx.env)
+                with timed(record.phases, "sweep"):
+                    report = sweep(ctx.cloud, tag, get_state_ids(stack))
+                print(format_sweep(report))
+                swept = any(report["deleted"].values())
+            ctx.governor.run(
+                ceiling,
+                lambda parallel, on_event: run_destroy(
+                    stack,
+                    parallel=parallel,
+                    on_event=chain_events(on_event, on_stack_event),
+                    timings=record.phases,
+                    targets=targets,
+                    refresh=swept,
+                ),
+            )
+        elif action == "up":
+            plan = plans.verify(work_dir) if plans else None
+            ctx.governor.run(
+                ceiling,
+                lambda parallel, on_event: run_up(
+                    stack,
+                    plan,
+                    parallel=parallel,
+                    on_event=chain_events(on_event, on_stack_event),
+                    timings=record.phases,
+                    targets=targets,
+                    state_targets=state_targets,
+                ),
+                # A partial apply moves the state away from the saved plan
+                retry=plan is None,
+            )
+            if plans:
+                plans.discard(work_dir)
+        record.status = "succeeded"
+    finally:
+        stats = ctx.summary.stacks.get(project)
+        ctx.history.record(ctx.run_id, ctx.env, record, stats)
+        if journal:
+            journal.update(work_dir, record.status)
+
+
+def save_previews(ctx: RunContext) -> None:
+    if ctx.previews is None:
+        return
+    header = utils.make_header("PREVIEW REPORT", ctx.env)
+    print(header)
+    print("\n".join(ctx.previews.format_table()))
+    replacements = ctx.previews.format_replacements()
+    if replacements:
+        print("\nReplacements:")
+        print("\n".join(replacements))
+    files = ctx.previews.save(get_run_dir(ctx.root_dir, "preview"))
+    print(f"\nReport saved to {', '.join(files)}")
+
+
+def run_history(root_dir: str, env: str, args: argparse.Namespace) -> None:
+    header = utils.make_header("HISTORY", env)
+    print(header)
+    history = HistoryStore(root_dir)
+    rows = history.find_regressions(env, args.window, args.threshold)
+    print(format_regressions(rows))
 
 
 def main():
@@ -63,6 +468,51 @@ def main():
         x for x in all_work_dirs if x not in set(app_exclude + infra_work_dirs)
     ]
 
+    try:
+        waves = get_waves(args.env, find_envs(all_work_dirs), args.wave)
+    except ValueError as e:
+        sys.exit(str(e))
+    envs = [env for wave in waves for env in wave]
+    if args.watch and len(envs) > 1:
+        sys.exit("--watch works only with a single environment")
+
+    if action == "history":
+        for env in envs:
+            run_history(root_dir, env, args)
+        return
+
+    # Offline, so every discovered stack is checked
+    if action == "validate":
+        results = [run_validate(root_dir, all_work_dirs, env) for env in envs]
+        if not all(results):
+            sys.exit(1)
+        return
+
+    # Read only, so every discovered stack is checked
+    if action == "drift":
+        results = [run_drift(root_dir, all_work_dirs, env) for env in envs]
+        if not all(results):
+            sys.exit(1)
+        return
+
+    # Read only, so every discovered stack is checked
+    if action == "state-report":
+        results = [
+            run_state_report(root_dir, all_work_dirs, env) for env in envs
+        ]
+        if not all(results):
+            sys.exit(1)
+        return
+
+    if action == "adopt":
+        results = [
+            run_adopt(root_dir, all_work_dirs, env, not args.dry_run)
+            for env in envs
+        ]
+        if not all(results):
+            sys.exit(1)
+        return
+
     # Need order - we remove apps first that depends on infra
     # So it prevents stucking of OpenStack API
     if action == "destroy":
@@ -74,16 +524,95 @@ def main():
         work_dirs = infra_work_dirs
         work_dirs.extend(app_work_dirs)
 
-    for work_dir in work_dirs:
-        stack = auto.create_or_select_stack(
-            stack_name=args.env, work_dir=work_dir
+    # Refuse before any stack of any env is touched
+    journals: dict[str, RunJournal] = {}
+    for env in envs:
+        # Destroy doesn't depend on config being valid
+        if args.preflight and action in ["up", "preview"]:
+            errors = run_preflight(all_work_dirs, work_dirs, env)
+            if errors:
+                print(utils.make_header("PREFLIGHT", env))
+                print("\n".join(errors))
+                sys.exit(1)
+
+        if action in ["up", "destroy"]:
+            journals[env] = RunJournal(root_dir, env)
+            if args.resume:
+                try:
+                    journals[env].load_previous(
+                        action, args.target_host, work_dirs
+                    )
+                except JournalError as e:
+                    sys.exit(str(e))
+
+        if args.plan and action == "up":
+            plans = PlanStore(root_dir, env)
+            for work_dir in work_dirs:
+                # Plans of completed stacks were discarded
+                if env in journals and journals[env].is_done(work_dir):
+                    continue
+                try:
+                    plans.verify(work_dir)
+                except PlanMismatchError as e:
+                    sys.exit(str(e))
+
+    cloud = None
+    if args.fast_destroy:
+        try:
+            cloud = connect()
+        except RuntimeError as e:
+            sys.exit(str(e))
+
+    history = HistoryStore(root_dir)
+    run_id = uuid.uuid4().hex
+    for journal in journals.values():
+        journal.start(run_id, action, args.target_host, work_dirs)
+
+    def run_env(env: str) -> bool:
+        ctx = RunContext(
+            root_dir=root_dir,
+            env=env,
+            args=args,
+            plans=PlanStore(root_dir, env) if args.plan else None,
+            governor=AdaptiveParallelism(),
+            summary=RunSummary(),
+            history=history,
+            run_id=run_id,
+            previews=PreviewReport(env) if action == "preview" else None,
+            cloud=cloud,
+            journal=journals.get(env),
         )
-        if action == "preview":
-            run_preview(stack)
-        elif action == "destroy":
-            run_destroy(stack)
-        elif action == "up":
-            run_up(stack)
+
+        for work_dir in work_dirs:
+            run_stack(ctx, work_dir)
+
+        ctx.summary.print()
+        save_previews(ctx)
+
+        if args.watch and action == "preview":
+            for changed_dirs in watch(root_dir, work_dirs, env):
+                for work_dir in changed_dirs:
+                    try:
+                        run_stack(ctx, work_dir)
+                    except auto.CommandError as e:
+                        # Keep watching, next save may fix it
+                        print(e)
+                ctx.summary.print()
+                save_previews(ctx)
+        return True
+
+    # Single env keeps running in the foreground with its exceptions
+    if len(envs) == 1:
+        with capture_stdout(), env_output(root_dir, envs[0], prefix=False):
+            run_env(envs[0])
+        return
+
+    results = run_waves(root_dir, waves, run_env, args.max_envs)
+    print(utils.make_header("ENVIRONMENTS", action))
+    for env, status in results.items():
+        print(f"{env:<24} {status}")
+    if any(x != "succeeded" for x in results.values()):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+from utils.adopt import CloudInventory, build_import_spec
+from utils.urns import (
+    FIP_ASSOCIATE_TYPE,
+    FLOATING_IP_TYPE,
+    INSTANCE_TYPE,
+    VM_GROUP_TYPE,
+    VM_TYPE,
+)
+
+
+def make_resource(type_, name, parent=None, custom=True, **state):
+    return {
+        "type": type_,
+        "name": name,
+        "parent": parent,
+        "custom": custom,
+        "state": state,
+    }
+
+
+def make_cloud(**lists) -> CloudInventory:
+    cloud = CloudInventory(None)
+    # cached_property reads the instance dict first
+    cloud.__dict__.update(lists)
+    return cloud
+
+
+def test_parents_precede_children():
+    resources = [
+        make_resource(VM_GROUP_TYPE, "group", custom=False),
+        make_resource(VM_TYPE, "vm-1", parent="group", custom=False),
+        make_resource(INSTANCE_TYPE, "vm-1", parent="vm-1"),
+        make_resource(VM_TYPE, "vm-2", parent="group", custom=False),
+        make_resource(INSTANCE_TYPE, "vm-2", parent="vm-2"),
+    ]
+    cloud = make_cloud(
+        servers={
+            "vm-1": [SimpleNamespace(id="server-1")],
+            "vm-2": [SimpleNamespace(id="server-2")],
+        }
+    )
+    spec = build_import_spec({"resources": resources}, cloud, {})
+
+    defined = set()
+    for item in spec["resources"]:
+        if "parent" in item:
+            assert item["parent"] in defined
+        if item.get("component"):
+            defined.add(item["logicalName"])
+    assert [x["name"] for x in spec["resources"]] == [
+        "group",
+        "vm-1",
+        "vm-2",
+        "vm-1",
+        "vm-2",
+    ]
+
+
+def test_existing_parent_goes_to_name_table():
+    resources = [
+        make_resource(VM_TYPE, "vm-1", custom=False),
+        make_resource(INSTANCE_TYPE, "vm-1", parent="vm-1"),
+    ]
+    cloud = make_cloud(servers={"vm-1": [SimpleNamespace(id="server-1")]})
+    existing = {f"{VM_TYPE}::vm-1": "urn:vm-1"}
+    spec = build_import_spec({"resources": resources}, cloud, existing)
+
+    assert spec["nameTable"] == {"vm-1-component": "urn:vm-1"}
+    assert [x["name"] for x in spec["resources"]] == ["vm-1"]
+
+
+def test_floating_ip_found_through_association():
+    resources = [
+        make_resource(INSTANCE_TYPE, "vm-1"),
+        make_resource(FLOATING_IP_TYPE, "fip-1"),
+        make_resource(
+            FIP_ASSOCIATE_TYPE,
+            "assoc-1",
+            instanceId="vm-1-id",
+            floatingIp="fip-1-address",
+        ),
+    ]
+    fip = SimpleNamespace(
+        id="fip-id",
+        port_id="port-1",
+        floating_ip_address="203.0.113.1",
+        fixed_ip_address="10.0.0.5",
+    )
+    cloud = make_cloud(
+        servers={"vm-1": [SimpleNamespace(id="server-1")]},
+        ports=[SimpleNamespace(id="port-1", device_id="server-1")],
+        floating_ips=[fip],
+    )
+    spec = build_import_spec({"resources": resources}, cloud, {})
+
+    ids = {x["name"]: x["id"] for x in spec["resources"]}
+    assert ids == {
+        "vm-1": "server-1",
+        "fip-1": "fip-id",
+        "assoc-1": "203.0.113.1/server-1/10.0.0.5",
+    }
@@ -0,0 +1,40 @@
+import pytest
+
+from utils.config_helpers import claim_floating_ips
+
+
+def make_pool(hosts: list[str], size: int) -> dict[str, dict[str, str]]:
+    fips = {
+        f"host-{x}": {"address": f"10.0.0.{i}"} for i, x in enumerate(hosts)
+    }
+    fips.update(
+        {f"spare-{i:03d}": {"address": f"10.0.1.{i}"} for i in range(size)}
+    )
+    return fips
+
+
+def test_added_host_keeps_claims():
+    fips = make_pool([], 5)
+    claims = claim_floating_ips(fips, ["web1", "web2", "web3"])
+    # Sorts before every existing host
+    added = claim_floating_ips(fips, ["app1", "web1", "web2", "web3"], claims)
+    assert {x: added[x] for x in claims} == claims
+    assert added["app1"] not in claims.values()
+
+
+def test_removed_host_keeps_claims():
+    fips = make_pool([], 5)
+    claims = claim_floating_ips(fips, ["web1", "web2", "web3"])
+    removed = claim_floating_ips(fips, ["web2", "web3"], claims)
+    assert removed == {x: claims[x] for x in ["web2", "web3"]}
+
+
+def test_dedicated_slot_wins():
+    fips = make_pool(["db1"], 2)
+    claims = claim_floating_ips(fips, ["db1", "web1"], {"db1": "10.0.1.0"})
+    assert claims == {"db1": "10.0.0.0", "web1": "10.0.1.0"}
+
+
+def test_pool_exhausted():
+    with pytest.raises(ValueError):
+        claim_floating_ips(make_pool([], 1), ["web1", "web2"])
@@ -0,0 +1,96 @@
+import pytest
+
+from utils.invoke import (
+    InvokeAmbiguousError,
+    InvokeAuthError,
+    InvokeNotFoundError,
+    InvokeTransientError,
+    ResilientInvoker,
+    classify_error,
+)
+from utils.throttle import THROTTLE_PATTERN
+
+# gophercloud unexpected status error
+GOT = (
+    "Expected HTTP response code [200] when accessing [GET {}],"
+    " but got {} instead"
+)
+
+
+@pytest.mark.parametrize(
+    "message, kind",
+    [
+        (GOT.format("http://nova/flavors", 404), "not_found"),
+        ("Your query returned no results", "not_found"),
+        ("Resource not found", "not_found"),
+        ("Your query returned more than one result", "ambiguous"),
+        ("Multiple images matched", "ambiguous"),
+        (GOT.format("http://keystone/tokens", 401), "auth"),
+        ("HTTP 403 Forbidden", "auth"),
+        (GOT.format("http://nova/servers", 503), "transient"),
+        ("Request returned 429", "transient"),
+        ("connection reset by peer", "transient"),
+        # Numbers in names are not statuses
+        (
+            "unable to retrieve image ubuntu-404: " + GOT.format("x", 503),
+            "transient",
+        ),
+        ("unable to retrieve flavor 1-4-404: connection refused", "transient"),
+        ("image web-401 not found", "not_found"),
+    ],
+)
+def test_classify_error(message, kind):
+    assert classify_error(Exception(message)) == kind
+
+
+@pytest.mark.parametrize(
+    "message, throttled",
+    [
+        (GOT.format("http://nova/servers", 409), True),
+        ("Request returned 503", True),
+        ("Internal Server Error", True),
+        ('{"overLimit": {"code": 413, "message": "Over limit"}}', True),
+        ("The server is temporarily overloaded", True),
+        ("flavor 1-4-409 not found", False),
+        ("dial tcp 10.0.0.5:5000: connection refused", False),
+        ("address 10.0.0.429 is in use", False),
+    ],
+)
+def test_throttle_pattern(message, throttled):
+    assert bool(THROTTLE_PATTERN.search(message)) == throttled
+
+
+def make_failing(message):
+    calls = []
+
+    def func():
+        calls.append(1)
+        raise Exception(message)
+
+    return func, calls
+
+
+@pytest.mark.parametrize(
+    "message, error",
+    [
+        ("Your query returned no results", InvokeNotFoundError),
+        ("Your query returned more than one result", InvokeAmbiguousError),
+        (GOT.format("http://keystone/tokens", 401), InvokeAuthError),
+    ],
+)
+def test_permanent_errors_are_not_retried(message, error):
+    invoker = ResilientInvoker(base_delay=0)
+    func, calls = make_failing(message)
+    with pytest.raises(error):
+        invoker.invoke("images", func)
+    assert len(calls) == 1
+    assert invoker.breakers["images"].failures == 0
+
+
+def test_transient_errors_are_retried():
+    invoker = ResilientInvoker(attempts=3, base_delay=0)
+    func, calls = make_failing(GOT.format("http://glance/images", 503))
+    with pytest.raises(InvokeTransientError):
+        invoker.invoke("images", func)
+    assert len(calls) == 3
+    assert invoker.get_stats()["images"]["retries"] == 2
@@ -0,0 +1,87 @@
+import pytest
+
+from utils.journal import JournalError, RunJournal
+
+
+@pytest.fixture
+def work_dirs(tmp_path):
+    result = []
+    for name in ["network", "test"]:
+        work_dir = tmp_path / "app" / name
+        work_dir.mkdir(parents=True)
+        (work_dir / "__main__.py").write_text(f"print('{name}')\n")
+        result.append(str(work_dir))
+    return result
+
+
+def fail_run(root_dir, work_dirs, targets=None):
+    journal = RunJournal(root_dir, "dev")
+    journal.start("run-1", "up", targets, work_dirs)
+    journal.update(work_dirs[0], "succeeded")
+    journal.update(work_dirs[1], "failed")
+
+
+def test_resume_skips_completed(tmp_path, work_dirs):
+    fail_run(str(tmp_path), work_dirs)
+
+    journal = RunJournal(str(tmp_path), "dev")
+    journal.load_previous("up", None, work_dirs)
+    assert journal.resumed_from == "run-1"
+    assert journal.is_done(work_dirs[0])
+    assert not journal.is_done(work_dirs[1])
+
+
+def test_changed_program_runs_again(tmp_path, work_dirs):
+    fail_run(str(tmp_path), work_dirs)
+    with open(f"{work_dirs[0]}/__main__.py", "a") as f:
+        f.write("print('changed')\n")
+
+    journal = RunJournal(str(tmp_path), "dev")
+    journal.load_previous("up", None, work_dirs)
+    assert not journal.is_done(work_dirs[0])
+
+
+def test_changed_env_config_runs_again(tmp_path, work_dirs):
+    fail_run(str(tmp_path), work_dirs)
+    with open(f"{work_dirs[0]}/Pulumi.dev.yaml", "w") as f:
+        f.write("config: {}\n")
+
+    journal = RunJournal(str(tmp_path), "dev")
+    journal.load_previous("up", None, work_dirs)
+    assert not journal.is_done(work_dirs[0])
+
+
+@pytest.mark.parametrize(
+    "action, targets, reverse",
+    [
+        ("destroy", None, False),
+        ("up", ["test01"], False),
+        ("up", None, True),
+    ],
+)
+def test_mismatched_run_is_refused(
+    tmp_path, work_dirs, action, targets, reverse
+):
+    fail_run(str(tmp_path), work_dirs)
+
+    journal = RunJournal(str(tmp_path), "dev")
+    with pytest.raises(JournalError):
+        journal.load_previous(
+            action, targets, work_dirs[::-1] if reverse else work_dirs
+        )
+
+
+def test_target_run_resumes_same_targets(tmp_path, work_dirs):
+    fail_run(str(tmp_path), work_dirs, targets=["test01"])
+
+    journal = RunJournal(str(tmp_path), "dev")
+    with pytest.raises(JournalError):
+        journal.load_previous("up", ["test02"], work_dirs)
+    journal.load_previous("up", ["test01"], work_dirs)
+    assert journal.is_done(work_dirs[0])
+
+
+def test_no_journal(tmp_path, work_dirs):
+    journal = RunJournal(str(tmp_path), "dev")
+    with pytest.raises(JournalError):
+        journal.load_previous("up", None, work_dirs)
@@ -0,0 +1,22 @@
+from utils.metrics import cached_lookup, metrics, set_lookup_scope
+
+
+def test_lookup_cache_is_scoped():
+    calls = []
+
+    @cached_lookup("test")
+    def lookup(name: str) -> str:
+        calls.append(name)
+        return f"{name}-{len(calls)}"
+
+    metrics.reset()
+    try:
+        set_lookup_scope("dev", "cloud-a")
+        assert lookup("flavor") == lookup("flavor") == "flavor-1"
+        set_lookup_scope("prod", "cloud-b")
+        assert lookup("flavor") == "flavor-2"
+        set_lookup_scope("dev", "cloud-a")
+        assert lookup("flavor") == "flavor-1"
+        assert metrics.get_stats()["test"]["misses"] == 2
+    finally:
+        set_lookup_scope()
@@ -0,0 +1,108 @@
+import os
+
+from utils.preflight import (
+    AppStack,
+    NetworkStack,
+    check_app_networks,
+    run_preflight,
+)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NETWORK = NetworkStack(
+    networks=[
+        {"name": "net1", "cidr": "192.168.98.0/24"},
+        {"name": "net2", "cidr": "192.168.99.0/24"},
+    ],
+    external_network="ext-net",
+    default_router="router",
+)
+
+
+def make_app(inventory, groups=None) -> AppStack:
+    return AppStack(
+        inventory=inventory,
+        groups=groups,
+        default_network="net1",
+        default_image="debian-11",
+        default_flavor="1-1-5",
+    )
+
+
+def check(inventory, groups=None) -> list[str]:
+    return check_app_networks("app.test", make_app(inventory, groups), NETWORK)
+
+
+def test_valid_inventory():
+    assert (
+        check(
+            [
+                {"host": "a", "fixed_ip": "192.168.98.10"},
+                {"host": "b", "network": "net2", "fixed_ip": "192.168.99.10"},
+            ],
+            [{"group": "w", "count": 2}],
+        )
+        == []
+    )
+
+
+def test_fixed_ip_outside_cidr():
+    errors = check(
+        [{"host": "a", "network": "net2", "fixed_ip": "192.168.98.10"}]
+    )
+    assert errors == [
+        "app.test: a fixed_ip 192.168.98.10 not in net2 CIDR 192.168.99.0/24"
+    ]
+
+
+def test_invalid_fixed_ip():
+    errors = check([{"host": "a", "fixed_ip": "192.168.98.300"}])
+    assert errors == ["app.test: a fixed_ip 192.168.98.300 invalid"]
+
+
+def test_duplicate_fixed_ip():
+    errors = check(
+        [
+            {"host": "a", "fixed_ip": "192.168.98.10"},
+            {"host": "b", "fixed_ip": "192.168.98.10"},
+        ]
+    )
+    assert errors == ["app.test: fixed_ip 192.168.98.10 used 2 times"]
+
+
+def test_unknown_network():
+    errors = check([{"host": "a", "network": "net3"}])
+    assert errors == [
+        "app.test: a uses network net3 not defined in infra.network"
+    ]
+
+
+def test_duplicate_hosts_across_groups():
+    errors = check(
+        [{"host": "w-01"}],
+        [{"group": "w", "count": 2}, {"group": "x", "hosts": ["w-02"]}],
+    )
+    assert sorted(errors) == [
+        "app.test: host w-01 defined 2 times",
+        "app.test: host w-02 defined 2 times",
+    ]
+
+
+def test_missing_network_config():
+    errors = check_app_networks("app.test", make_app([]), None)
+    assert errors == [
+        "app.test: no valid infra.network config to check against"
+    ]
+
+
+def test_example_env():
+    # test01 of the example config sits on some-net2 with a some-net1 address
+    work_dirs = [
+        os.path.join(ROOT_DIR, "infra", "network"),
+        os.path.join(ROOT_DIR, "app", "test"),
+    ]
+    errors = run_preflight(work_dirs, work_dirs, "example")
+    assert errors == [
+        "app.test: test01 fixed_ip 192.168.98.123"
+        " not in some-net2 CIDR 192.168.99.0/24"
+    ]
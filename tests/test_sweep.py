@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+from utils.sweep import get_state_ids, sweep
+
+TAG = "pulumi:app.test:dev"
+
+
+class FakeCloud:
+    def __init__(self):
+        self.deleted: list[str] = []
+        server = SimpleNamespace(id="server-mine", tags=[TAG])
+        other = SimpleNamespace(id="server-other", tags=[TAG])
+        fip = SimpleNamespace(id="fip-other", tags=[TAG])
+        volume = SimpleNamespace(
+            id="volume-mine", metadata={"pulumi-stack": TAG}
+        )
+        self.compute = SimpleNamespace(
+            servers=lambda tags: [server, other],
+            delete_server=lambda x: self.deleted.append(x.id),
+            wait_for_delete=lambda x, wait: None,
+        )
+        self.network = SimpleNamespace(
+            ips=lambda tags: [fip],
+            delete_ip=lambda x: self.deleted.append(x.id),
+        )
+        self.block_storage = SimpleNamespace(
+            volumes=lambda details: [volume],
+            delete_volume=lambda x: self.deleted.append(x.id),
+        )
+
+
+def test_sweep_deletes_only_state_owned():
+    stack = SimpleNamespace(
+        export_stack=lambda: SimpleNamespace(
+            deployment={
+                "resources": [
+                    {"urn": "stack"},
+                    {"urn": "server", "id": "server-mine"},
+                    {"urn": "volume", "id": "volume-mine"},
+                ]
+            }
+        )
+    )
+    cloud = FakeCloud()
+    report = sweep(cloud, TAG, get_state_ids(stack))
+
+    assert sorted(cloud.deleted) == ["server-mine", "volume-mine"]
+    assert report["foreign"] == 2
+    assert report["errors"] == []
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from utils.targets import resolve_targets
+from utils.urns import (
+    INSTANCE_TYPE,
+    SERVER_GROUP_TYPE,
+    VM_GROUP_TYPE,
+    make_urn,
+)
+
+CONFIG = """\
+config:
+  app.test:groups:
+    - group: worker
+      count: 2
+      anti_affinity: true
+"""
+
+
+def make_stack(urns: list[str]) -> SimpleNamespace:
+    deployment = {"resources": [{"urn": x} for x in urns]}
+    return SimpleNamespace(
+        export_stack=lambda: SimpleNamespace(deployment=deployment)
+    )
+
+
+def make_work_dir(tmp_path):
+    (tmp_path / "Pulumi.yaml").write_text("name: app.test\n")
+    (tmp_path / "Pulumi.dev.yaml").write_text(CONFIG)
+    return str(tmp_path)
+
+
+GROUP_URN = make_urn("dev", "app.test", [VM_GROUP_TYPE], "dev-vm-group-worker")
+SERVER_GROUP_URN = make_urn(
+    "dev",
+    "app.test",
+    [VM_GROUP_TYPE, SERVER_GROUP_TYPE],
+    "dev-vm-group-worker-server-group",
+)
+MEMBER_URN = make_urn(
+    "dev", "app.test", [VM_GROUP_TYPE, INSTANCE_TYPE], "dev-vm-worker-02"
+)
+
+
+def test_fresh_group_member_targets_group(tmp_path):
+    targets, in_state = resolve_targets(
+        make_stack([]), make_work_dir(tmp_path), "dev", ["worker-02"]
+    )
+    assert set(targets) == {MEMBER_URN, GROUP_URN, SERVER_GROUP_URN}
+    assert in_state == []
+
+
+def test_existing_group_is_not_targeted(tmp_path):
+    targets, _ = resolve_targets(
+        make_stack([GROUP_URN, SERVER_GROUP_URN]),
+        make_work_dir(tmp_path),
+        "dev",
+        ["worker-02"],
+    )
+    assert targets == [MEMBER_URN]
@@ -0,0 +1,409 @@
+import json
+import os
+from collections import defaultdict
+from functools import cached_property
+from typing import Any
+
+from pulumi import automation as auto
+from pulumi.runtime.mocks import MockMonitor
+
+from utils.plan import get_run_dir
+from utils.urns import (
+    FIP_ASSOCIATE_TYPE,
+    FLOATING_IP_TYPE,
+    INSTANCE_TYPE,
+    KEYPAIR_TYPE,
+    NETWORK_TYPE,
+    ROUTER_IFACE_TYPE,
+    SERVER_GROUP_TYPE,
+    SG_RULE_TYPE,
+    SG_TYPE,
+    STACK_TYPE,
+    SUBNET_TYPE,
+    VOLUME_TYPE,
+    get_name,
+    get_resource_type,
+)
+from utils.validate import read_project_name, run_offline, run_per_stack
+
+ROUTER_IFACE_OWNERS = {
+    "network:router_interface",
+    "network:router_interface_distributed",
+}
+
+
+class RecordingMonitor(MockMonitor):
+    def __init__(self, mocks):
+        super().__init__(mocks)
+        # urn -> parent urn and whether it's a custom resource
+        self.details: dict[str, dict[str, Any]] = {}
+
+    def RegisterResource(self, request):
+        urn = self.make_urn(request.parent, request.type, request.name)
+        self.details[urn] = {"parent": request.parent, "custom": request.custom}
+        return super().RegisterResource(request)
+
+
+def get_parent_name(parent: str | None) -> str | None:
+    # Root stack children are imported without a parent
+    if not parent or get_resource_type(parent) == STACK_TYPE:
+        return None
+    return get_name(parent)
+
+
+def predict_resources(work_dir: str, env: str) -> dict[str, Any]:
+    # Programs run offline, so names are exactly what an update would use
+    monitor, _, errors = run_offline(
+        work_dir, env, monitor_cls=RecordingMonitor
+    )
+    resources = []
+    for urn, resource in monitor.get_registered_resources().items():
+        details = monitor.details.get(urn, {})
+        resources.append(
+            {
+                "type": get_resource_type(urn),
+                "name": get_name(urn),
+                "parent": get_parent_name(details.get("parent")),
+                "custom": bool(details.get("custom")),
+                "state": json.loads(json.dumps(resource.state, default=str)),
+            }
+        )
+    return {
+        "project": read_project_name(work_dir),
+        "errors": errors,
+        "resources": resources,
+    }
+
+
+def connect() -> Any:
+    try:
+        import openstack
+    except ImportError as e:
+        raise RuntimeError(
+            "openstacksdk is required, pip install openstacksdk"
+        ) from e
+    # Same OS_* variables or clouds.yaml the provider uses
+    return openstack.connect()
+
+
+def index_by_name(items: Any) -> dict[str, list[Any]]:
+    result = defaultdict(list)
+    for item in items:
+        result[item.name].append(item)
+    return result
+
+
+class CloudInventory:
+    # One list call per resource type, loaded on first use
+    def __init__(self, conn: Any):
+        self.conn = conn
+
+    @cached_property
+    def networks(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.network.networks())
+
+    @cached_property
+    def subnets(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.network.subnets())
+
+    @cached_property
+    def security_groups(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.network.security_groups())
+
+    @cached_property
+    def security_group_rules(self) -> list[Any]:
+        return list(self.conn.network.security_group_rules())
+
+    @cached_property
+    def servers(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.compute.servers())
+
+    @cached_property
+    def server_groups(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.compute.server_groups())
+
+    @cached_property
+    def keypairs(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.compute.keypairs())
+
+    @cached_property
+    def volumes(self) -> dict[str, list[Any]]:
+        return index_by_name(self.conn.block_storage.volumes())
+
+    @cached_property
+    def ports(self) -> list[Any]:
+        return list(self.conn.network.ports())
+
+    @cached_property
+    def floating_ips(self) -> list[Any]:
+        return list(self.conn.network.ips())
+
+    @cached_property
+    def ports_by_device(self) -> dict[str, list[Any]]:
+        result = defaultdict(list)
+        for port in self.ports:
+            result[port.device_id].append(port)
+        return result
+
+    @cached_property
+    def floating_ips_by_port(self) -> dict[str, Any]:
+        return {x.port_id: x for x in self.floating_ips if x.port_id}
+
+
+class Matcher:
+    def __init__(self, cloud: CloudInventory, resources: list[dict[str, Any]]):
+        self.cloud = cloud
+        # Components share names with their children
+        self.resources = {x["name"]: x for x in resources if x["custom"]}
+        # Mock outputs are "<name>-id" and "<name>-address",
+        # so inputs referencing other resources can be followed
+        self.references = {}
+        for resource in resources:
+            self.references[f"{resource['name']}-id"] = resource["name"]
+            self.references[f"{resource['name']}-address"] = resource["name"]
+        # floating IP name -> association pointing at it
+        self.associations = {
+            self.references.get(x["state"].get("floatingIp")): x
+            for x in self.resources.values()
+            if x["type"] == FIP_ASSOCIATE_TYPE
+        }
+        self.matches: dict[str, Any] = {}
+
+    def resolve(self, value: Any) -> Any:
+        name = self.references.get(value) if isinstance(value, str) else None
+        if name is None:
+            return None
+        return self.match(self.resources[name])
+
+    def match(self, resource: dict[str, Any]) -> Any:
+        name = resource["name"]
+        if name not in self.matches:
+            self.matches[name] = self.find(resource)
+        return self.matches[name]
+
+    def by_name(self, items: dict[str, list[Any]], name: str) -> Any:
+        found = items.get(name) or []
+        if len(found) > 1:
+            raise LookupError(f"{len(found)} objects named {name}")
+        return found[0] if found else None
+
+    def get_server_fip(self, server: Any) -> Any:
+        for port in self.cloud.ports_by_device.get(server.id, []):
+            fip = self.cloud.floating_ips_by_port.get(port.id)
+            if fip is not None:
+                return fip
+        return None
+
+    def find(self, resource: dict[str, Any]) -> Any:
+        type_, state = resource["type"], resource["state"]
+        name = state.get("name", resource["name"])
+        if type_ == NETWORK_TYPE:
+            return self.by_name(self.cloud.networks, name)
+        if type_ == SUBNET_TYPE:
+            return self.by_name(self.cloud.subnets, name)
+        if type_ == SG_TYPE:
+            return self.by_name(self.cloud.security_groups, name)
+        if type_ == INSTANCE_TYPE:
+            return self.by_name(self.cloud.servers, name)
+        if type_ == SERVER_GROUP_TYPE:
+            return self.by_name(self.cloud.server_groups, name)
+        if type_ == KEYPAIR_TYPE:
+            return self.by_name(self.cloud.keypairs, name)
+        if type_ == VOLUME_TYPE:
+            return self.by_name(self.cloud.volumes, name)
+        if type_ == SG_RULE_TYPE:
+            sg = self.resolve(state.get("securityGroupId"))
+            if sg is None:
+                return None
+            return next(
+                (
+                    x
+                    for x in self.cloud.security_group_rules
+                    if x.security_group_id == sg.id
+                    and x.direction == state.get("direction")
+                    and x.ether_type == state.get("ethertype")
+                    and x.protocol == state.get("protocol")
+                    and x.port_range_min == state.get("portRangeMin")
+                    and x.port_range_max == state.get("portRangeMax")
+                    and x.remote_ip_prefix == state.get("remoteIpPrefix")
+                ),
+                None,
+            )
+        if type_ == ROUTER_IFACE_TYPE:
+            subnet = self.resolve(state.get("subnetId"))
+            if subnet is None:
+                return None
+            return next(
+                (
+                    x
+                    for x in self.cloud.ports
+                    if x.device_owner in ROUTER_IFACE_OWNERS
+                    and any(
+                        ip.get("subnet_id") == subnet.id for ip in x.fixed_ips
+                    )
+                ),
+                None,
+            )
+        if type_ == FIP_ASSOCIATE_TYPE:
+            server = self.resolve(state.get("instanceId"))
+            return self.get_server_fip(server) if server else None
+        if type_ == FLOATING_IP_TYPE:
+            # Found through the association pointing at it
+            association = self.associations.get(resource["name"])
+            return self.match(association) if association else None
+        raise LookupError(f"{type_} can't be adopted")
+
+    def get_import_id(self, resource: dict[str, Any], found: Any) -> str:
+        if resource["type"] == FIP_ASSOCIATE_TYPE:
+            server = self.resolve(resource["state"].get("instanceId"))
+            return (
+                f"{found.floating_ip_address}/{server.id}"
+                f"/{found.fixed_ip_address}"
+            )
+        if resource["type"] == KEYPAIR_TYPE:
+            return found.name
+        return found.id
+
+
+def get_component_ref(name: str) -> str:
+    # Components share names with their children, refer to them uniquely
+    return f"{name}-component"
+
+
+def build_import_spec(
+    prediction: dict[str, Any], cloud: CloudInventory, existing: dict[str, str]
+) -> dict[str, Any]:
+    resources = prediction["resources"]
+    components = {x["name"]: x for x in resources if not x["custom"]}
+    matcher = Matcher(cloud, resources)
+
+    spec: list[dict[str, Any]] = []
+    # Placeholders go first, each after its own parent
+    parents: list[dict[str, Any]] = []
+    name_table: dict[str, str] = {}
+    added: set[str] = set()
+    missing, skipped = [], []
+
+    def add_parents(name: str | None) -> None:
+        # Import creates placeholder components for missing parents,
+        # root first so they exist when children are imported
+        chain = []
+        while name and name in components and name not in added:
+            component = components[name]
+            key = f"{component['type']}::{name}"
+            added.add(name)
+            if key in existing:
+                name_table[get_component_ref(name)] = existing[key]
+                break
+            chain.append(component)
+            name = component["parent"]
+        for component in reversed(chain):
+            item = {
+                "type": component["type"],
+                "name": component["name"],
+                "logicalName": get_component_ref(component["name"]),
+                "component": True,
+            }
+            if component["parent"]:
+                item["parent"] = get_component_ref(component["parent"])
+            parents.append(item)
+
+    for resource in resources:
+        if not resource["custom"] or resource["type"].startswith("pulumi:"):
+            continue
+        if f"{resource['type']}::{resource['name']}" in existing:
+            skipped.append(resource["name"])
+            continue
+        try:
+            found = matcher.match(resource)
+        except LookupError as e:
+            missing.append({"name": resource["name"], "reason": str(e)})
+            continue
+        if found is None:
+            missing.append({"name": resource["name"], "reason": "not found"})
+            continue
+
+        item = {
+            "type": resource["type"],
+            "name": resource["name"],
+            "id": matcher.get_import_id(resource, found),
+        }
+        if resource["parent"]:
+            item["parent"] = get_component_ref(resource["parent"])
+            add_parents(resource["parent"])
+        spec.append(item)
+
+    return {
+        "nameTable": name_table,
+        "resources": [*parents, *spec],
+        "missing": missing,
+        "in_state": skipped,
+    }
+
+
+def get_existing(stack: auto.Stack) -> dict[str, str]:
+    resources = stack.export_stack().deployment.get("resources") or []
+    return {f"{x['type']}::{get_name(x['urn'])}": x["urn"] for x in resources}
+
+
+def adopt_all(
+    root_dir: str, work_dirs: list[str], env: str, apply: bool
+) -> list[dict[str, Any]]:
+    predictions = run_per_stack(predict_resources, work_dirs, env)
+
+    cloud = CloudInventory(connect())
+    reports = []
+    for work_dir, prediction in zip(work_dirs, predictions):
+        project = prediction["project"]
+        report = {"stack": project, "errors": prediction["errors"]}
+        reports.append(report)
+        if prediction["errors"]:
+            continue
+
+        stack = auto.create_or_select_stack(stack_name=env, work_dir=work_dir)
+        result = build_import_spec(prediction, cloud, get_existing(stack))
+        report.update(result)
+
+        spec_file = os.path.join(
+            get_run_dir(root_dir, "adopt"), f"{project}.{env}.json"
+        )
+        with open(spec_file, "w") as f:
+            # Same format as pulumi import --file
+            json.dump(
+                {
+                    "nameTable": result["nameTable"],
+                    "resources": result["resources"],
+                },
+                f,
+                indent=2,
+            )
+        report["spec_file"] = spec_file
+
+        if apply and result["resources"]:
+            # Import only records state, nothing is changed in OpenStack
+            stack.import_resources(
+                resources=result["resources"],  # type: ignore
+                name_table=result["nameTable"],
+                generate_code=False,
+                on_output=print,
+            )
+    return reports
+
+
+def format_adopt(reports: list[dict[str, Any]]) -> str:
+    lines = []
+    for report in reports:
+        if report["errors"]:
+            lines.append(f"FAIL {report['stack']}: program failed offline")
+            for error in report["errors"]:
+                lines.append(f"  [{error['kind']}] {error['message']}")
+            continue
+        adopted = [x for x in report["resources"] if not x.get("component")]
+        lines.append(
+            f"{report['stack']}: {len(adopted)} to import,"
+            f" {len(report['in_state'])} already in state,"
+            f" {len(report['missing'])} not matched -> {report['spec_file']}"
+        )
+        for item in report["missing"]:
+            lines.append(f"  {item['name']}: {item['reason']}")
+    return "\n".join(lines)
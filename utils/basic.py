@@ -109,3 +109,26 @@ def read_pulumi_config(filename: str) -> None | Any:
         return None
 
     return yaml.safe_load(network_yaml)["config"]
+
+
+def get_project_config_value(value: Any) -> Any:
+    # Project config takes objects and lists only in the `value:` form
+    if isinstance(value, dict) and "value" in value:
+        return value["value"]
+    return value
+
+
+def read_stack_config(work_dir: str, env: str) -> dict[str, Any]:
+    result = {}
+    for filename in ["Pulumi.yaml", f"Pulumi.{env}.yaml"]:
+        path = os.path.join(work_dir, filename)
+        if not file_exists(path):
+            continue
+        with open(path, "r") as f:
+            data = yaml.safe_load(f) or {}
+        for key, value in (data.get("config") or {}).items():
+            if filename == "Pulumi.yaml":
+                value = get_project_config_value(value)
+            # Drop project namespace, e.g. app.test:inventory
+            result[key.rsplit(":", 1)[-1]] = value
+    return result
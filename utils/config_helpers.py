@@ -1,5 +1,6 @@
 import os
-from functools import cache
+import time
+from functools import partial
 from typing import Any, Sequence
 
 import pulumi
@@ -18,36 +19,93 @@ import component
 import utils.basic as utils
 from component.config import StackInfo
 from component.security_group import SgParams
+from utils.inventory import HostDefaults, HostSpec, get_group_hosts
+from utils.invoke import InvokeAmbiguousError, InvokeNotFoundError, invoker
+from utils.metrics import cached_lookup, metrics
+from utils.report import log_stats
 
 
-@cache
+@cached_lookup("flavor")
 def get_flavor_by_name(
     flavor_name: str,
 ) -> AwaitableGetFlavorResult | None:
     try:
-        return openstack.compute.get_flavor(name=flavor_name)
-    except Exception:
+        return invoker.invoke(
+            "compute", openstack.compute.get_flavor, name=flavor_name
+        )
+    except InvokeNotFoundError:
         pulumi.log.error("Flavor {} not found".format(flavor_name))
+    except InvokeAmbiguousError:
+        pulumi.log.error(
+            "Flavor {} matches several flavors".format(flavor_name)
+        )
     return
 
 
-@cache
+@cached_lookup("image")
 def get_image_by_name(image_name: str) -> AwaitableGetImageResult | None:
     try:
-        return openstack.images.get_image(name=image_name)
-    except Exception:
+        return invoker.invoke(
+            "images", openstack.images.get_image, name=image_name
+        )
+    except InvokeNotFoundError:
         pulumi.log.error("Image {} not found".format(image_name))
+    except InvokeAmbiguousError:
+        pulumi.log.error("Image {} matches several images".format(image_name))
     return
 
 
-@cache
+@cached_lookup("network")
 def get_network_by_name(name: str) -> AwaitableGetNetworkResult:
-    return openstack.networking.get_network(name=name)
+    return invoker.invoke(
+        "networking", openstack.networking.get_network, name=name
+    )
 
 
-@cache
+@cached_lookup("router")
 def get_router_by_name(name: str) -> AwaitableGetRouterResult:
-    return openstack.networking.get_router(name=name)
+    return invoker.invoke(
+        "networking", openstack.networking.get_router, name=name
+    )
+
+
+def claim_floating_ips(
+    fips: dict[str, dict[str, str]],
+    hosts: list[str],
+    previous: dict[str, str] | None = None,
+) -> dict[str, str]:
+    result = {}
+    spare = {
+        fip["address"]: slot
+        for slot, fip in fips.items()
+        if slot.startswith("spare-")
+    }
+    # Dedicated slots first
+    for host in hosts:
+        slot = f"host-{host}"
+        if slot in fips:
+            result[host] = fips[slot]["address"]
+
+    # Claims of the last run stick, so adding or removing a host
+    # never moves the address of another one
+    for host, address in sorted((previous or {}).items()):
+        if host in hosts and host not in result and address in spare:
+            result[host] = address
+            del spare[address]
+
+    free = sorted(spare, key=spare.__getitem__)
+    for host in sorted(hosts):
+        if host in result:
+            continue
+        if not free:
+            raise ValueError(f"FIP pool exhausted, no address for {host}")
+        result[host] = free.pop(0)
+    return result
+
+
+def report_stats() -> None:
+    log_stats("invoke", invoker.get_stats())
+    log_stats("lookups", metrics.get_stats())
 
 
 def make_output_block_devices(
@@ -67,14 +125,18 @@ def make_output_block_devices(
 
 
 class CreateVM:
-    config = component.Config()
-    stack_info = config.parse_stack()
-    stack = stack_info.env_suffix
-    proj = stack_info.env_prefix
     org = "organization"
-
-    def __init__(self, vm_obj):
+    # (stackref, output name) -> output, shared by all VMs
+    _stackref_outputs: dict[tuple[StackReference, str], Output[Any]] = {}
+    # Config is bound to the running project and stack, so programs
+    # sharing one interpreter don't see each other's config
+    _configs: dict[tuple[str, str], component.Config] = {}
+    _defaults: dict[tuple[str, str], HostDefaults] = {}
+
+    def __init__(self, vm_obj: dict[str, Any] | HostSpec):
         self.vm_obj = vm_obj
+        self.fip_claims: Output[dict[str, str]] | None = None
+        self.volumes_stackref: StackReference | None = None
 
     def create_stackrefs(
         self,
@@ -82,11 +144,16 @@ class CreateVM:
         network_stackref: StackReference,
         default_sg_stackref: StackReference,
         keypair_stackref: StackReference | None = None,
+        volumes_stackref: StackReference | None = None,
     ) -> None:
         self.network_stackref = network_stackref
         self.default_sg_stackref = default_sg_stackref
         if keypair_stackref:
             self.keypair_stackref = keypair_stackref
+        self.volumes_stackref = volumes_stackref
+
+    def set_fip_claims(self, fip_claims: Output[dict[str, str]]) -> None:
+        self.fip_claims = fip_claims
 
     def set_user_data(
         self, user_data: str | Output[str] | AwaitableGetConfigResult
@@ -102,37 +169,84 @@ class CreateVM:
         if self.vm_nat:
             self.create_nat(self.vm)
 
-    def init_params(self, vm_obj) -> None:
-        # TODO: Perhaps it's quite unoptimal to make required
-        # default params. Leave it for now.
-        self.default_network = self.config.require("default_network")
-        self.default_image = self.config.require("default_image")
-        self.default_flavor = self.config.require("default_flavor")
-
-        self.vm_name = vm_obj["host"]
-        self.vm_net = vm_obj.get("network", self.default_network)
-        self.vm_nat = vm_obj.get("nat")
-        self.vm_flavor = vm_obj.get("flavor")
-        self.vm_image = vm_obj.get("image")
-        self.vm_second_iface = vm_obj.get("second_iface")
-        self.vm_boot_volume = vm_obj.get("boot_volume")
+    def get_host_outputs(self) -> dict[str, dict[str, Output[str] | None]]:
+        return {
+            self.vm_name: {
+                "address": self.vm.instance.access_ip_v4,
+                "fip": self.vm_fip.address if self.vm_nat else None,
+            }
+        }
+
+    def release(self) -> None:
+        # Registered resources are tracked by the engine,
+        # builder state isn't needed past this point
+        vars(self).clear()
+
+    def init_params(self, vm_obj: dict[str, Any] | HostSpec) -> None:
+        defaults = self.get_defaults()
+        self.default_network = defaults.network
+        self.default_image = defaults.image
+        self.default_flavor = defaults.flavor
+
+        if not isinstance(vm_obj, HostSpec):
+            vm_obj = HostSpec.from_item(vm_obj, defaults)
+        self.vm_name = vm_obj.host
+        self.vm_net = vm_obj.network
+        self.vm_nat = vm_obj.nat
+        self.vm_flavor = vm_obj.flavor
+        self.vm_image = vm_obj.image
+        self.vm_second_iface = vm_obj.second_iface
+        self.vm_boot_volume = vm_obj.boot_volume
 
         self.network_name = f"{self.stack}-{self.vm_net}"
 
         self.vm_image_id = self.get_image().id
         self.vm_flavor_id = self.get_flavor().id
 
-        self.vm_fixed_ip = vm_obj.get("fixed_ip")
+        self.vm_fixed_ip = vm_obj.fixed_ip
         if self.vm_fixed_ip:
             self.validate_addresses("../../infra/network")
 
     @classmethod
     def get_config(cls) -> component.Config:
-        return cls.config
+        key = (pulumi.get_project(), pulumi.get_stack())
+        if key not in cls._configs:
+            cls._configs[key] = component.Config()
+        return cls._configs[key]
+
+    @classmethod
+    def get_defaults(cls) -> HostDefaults:
+        # TODO: Perhaps it's quite unoptimal to make required
+        # default params. Leave it for now.
+        key = (pulumi.get_project(), pulumi.get_stack())
+        if key not in cls._defaults:
+            config = cls.get_config()
+            cls._defaults[key] = HostDefaults(
+                network=config.require("default_network"),
+                image=config.require("default_image"),
+                flavor=config.require("default_flavor"),
+            )
+        return cls._defaults[key]
 
     @classmethod
     def get_stack_info(cls) -> StackInfo:
-        return cls.stack_info
+        return cls.get_config().parse_stack()
+
+    @property
+    def config(self) -> component.Config:
+        return self.get_config()
+
+    @property
+    def stack_info(self) -> StackInfo:
+        return self.get_stack_info()
+
+    @property
+    def stack(self) -> str:
+        return self.stack_info.env_suffix
+
+    @property
+    def proj(self) -> str:
+        return self.stack_info.env_prefix
 
     @classmethod
     def get_org(cls) -> str:
@@ -173,7 +287,12 @@ class CreateVM:
         sg_name = self.get_output_default_sg().apply(
             lambda sg: sg["sg"]["name"]
         )
-        internal_net_id = get_network_by_name(self.network_name).id
+        # Callback must not keep the builder alive until outputs resolve
+        internal_net_id = self.get_output_networks().apply(
+            partial(
+                self.get_network_id, vm_net=self.vm_net, vm_name=self.vm_name
+            )
+        )
 
         result = component.VmConfig(
             name=self.vm_name,
@@ -191,6 +310,15 @@ class CreateVM:
 
         if self.vm_boot_volume is not None:
             result.boot_volume = self.vm_boot_volume
+            if self.volumes_stackref:
+                result.base_volume_id = self.get_output_base_volumes().apply(
+                    partial(
+                        self.get_base_volume_id,
+                        image=self.vm_image,
+                        size=self.vm_boot_volume,
+                        vm_name=self.vm_name,
+                    )
+                )
 
         if self.user_data:
             result.user_data = self.user_data
@@ -235,11 +363,51 @@ class CreateVM:
         stackref: StackReference,
         parameter: str,
     ) -> Output[Any]:
-        return stackref.get_output(parameter)
+        key = (stackref, parameter)
+        start = time.perf_counter()
+        hit = key in self._stackref_outputs
+        if not hit:
+            self._stackref_outputs[key] = stackref.get_output(parameter)
+        metrics.record(
+            "stackref_output", hit=hit, seconds=time.perf_counter() - start
+        )
+        return self._stackref_outputs[key]
 
     def get_output_default_sg(self) -> Output[Any]:
         return self.get_stackref_output(self.default_sg_stackref, "sg")
 
+    @staticmethod
+    def get_network_id(
+        networks: dict[str, dict[str, str]], vm_net: str, vm_name: str
+    ) -> str:
+        network = networks.get(vm_net)
+        if network is None:
+            raise ValueError(
+                f"Network {vm_net} of vm {vm_name}"
+                " not found in infra.network outputs"
+            )
+        return network["id"]
+
+    @staticmethod
+    def get_base_volume_id(
+        volumes: dict[str, dict[str, Any]], image: str, size: int, vm_name: str
+    ) -> str | None:
+        volume = volumes.get(image)
+        # Clone can't be smaller than its source
+        if volume is None or volume["size"] > size:
+            pulumi.log.warn(
+                f"No base volume of image {image} fits vm {vm_name},"
+                " booting from image"
+            )
+            return None
+        return volume["id"]
+
+    def get_output_base_volumes(self) -> Output[Any]:
+        return self.get_stackref_output(self.volumes_stackref, "volumes")
+
+    def get_output_networks(self) -> Output[Any]:
+        return self.get_stackref_output(self.network_stackref, "networks")
+
     def get_output_keypair(self) -> Output[Any]:
         return self.get_stackref_output(self.keypair_stackref, "keypair")
 
@@ -256,17 +424,67 @@ class CreateVM:
         self.vm = component.Vm(f"{self.stack}-vm-{self.vm_name}", args=args)
 
     def create_nat(self, vm):
+        self.vm_fip = self.create_fip(self.vm_name, vm.instance.id)
+
+    def create_fip(self, vm_name: str, instance_id: Output[str]):
         self.fip_args = component.FipConfig(
-            pool=self.get_output_external_net(),
-            fip_name=f"{self.stack}-fip-{self.vm_name}",
-            fip_associate_name=f"{self.stack}-fip-associate-{self.vm_name}",
-            instance_id=vm.instance.id,
+            fip_name=f"{self.stack}-fip-{vm_name}",
+            fip_associate_name=f"{self.stack}-fip-associate-{vm_name}",
+            instance_id=instance_id,
         )
-        self.vm_fip = component.Fip(
+        if self.fip_claims is not None:
+            self.fip_args.floating_ip = self.fip_claims.apply(
+                lambda claims: claims[vm_name]
+            )
+        else:
+            self.fip_args.pool = self.get_output_external_net()
+
+        return component.Fip(
             args=self.fip_args,
         )
 
 
+class CreateVmGroup(CreateVM):
+    def __init__(self, group_obj):
+        # Shared params are resolved once under the group name
+        super().__init__({**group_obj, "host": group_obj["group"]})
+        self.group_name = group_obj["group"]
+
+    def run_all(self):
+        self.init_params(self.vm_obj)
+        self.vm_args = self.create_config()
+        self.hosts = get_group_hosts(self.vm_obj)
+
+        policy = self.vm_obj.get("server_group_policy")
+        if policy is None and self.vm_obj.get("anti_affinity"):
+            policy = "anti-affinity"
+
+        self.group_args = component.VmGroupConfig(
+            name=self.group_name,
+            template=self.vm_args,
+            hosts=self.hosts,
+            name_prefix=f"{self.stack}-vm-",
+            server_group_policy=policy,
+        )
+        self.group = component.VmGroup(
+            f"{self.stack}-vm-group-{self.group_name}", args=self.group_args
+        )
+
+        self.vm_fips = {}
+        if self.vm_nat:
+            for host, instance in self.group.instances.items():
+                self.vm_fips[host] = self.create_fip(host, instance.id)
+
+    def get_host_outputs(self) -> dict[str, dict[str, Output[str] | None]]:
+        return {
+            host: {
+                "address": instance.access_ip_v4,
+                "fip": self.vm_fips[host].address if self.vm_nat else None,
+            }
+            for host, instance in self.group.instances.items()
+        }
+
+
 class CreateSgRulesConfig:
     def __init__(
         self,
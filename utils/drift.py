@@ -0,0 +1,117 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pulumi import automation as auto
+
+from utils.plan import get_project_name
+from utils.throttle import DEFAULT_PARALLEL
+from utils.urns import get_name, get_type_name
+
+
+def diff_outputs(
+    old: dict[str, Any], new: dict[str, Any]
+) -> dict[str, dict[str, Any]]:
+    return {
+        key: {"old": old.get(key), "new": new.get(key)}
+        for key in sorted(set(old) | set(new))
+        if not key.startswith("__") and old.get(key) != new.get(key)
+    }
+
+
+class DriftCollector:
+    def __init__(self):
+        self.resources: dict[str, dict[str, Any]] = {}
+
+    def on_event(self, event: auto.EngineEvent) -> None:
+        step = event.resource_pre_event or event.res_outputs_event
+        if step is None:
+            return
+        metadata = step.metadata
+        # Components and the stack itself have nothing to refresh
+        if metadata.old is None or not metadata.old.custom:
+            return
+
+        old = dict(metadata.old.outputs or {})
+        if metadata.new is None or metadata.op == auto.OpType.DELETE:
+            status, properties = "deleted", {}
+        else:
+            properties = diff_outputs(old, dict(metadata.new.outputs or {}))
+            # Engine diffs win, outputs may carry provider noise
+            if metadata.diffs:
+                properties = {k: properties.get(k, {}) for k in metadata.diffs}
+            status = "changed" if properties else None
+
+        if status is None:
+            self.resources.pop(metadata.urn, None)
+            return
+        self.resources[metadata.urn] = {
+            "urn": metadata.urn,
+            "name": get_name(metadata.urn),
+            "type": get_type_name(metadata.type),
+            "status": status,
+            "properties": properties,
+        }
+
+
+def detect_stack_drift(
+    root_dir: str, work_dir: str, env: str
+) -> dict[str, Any]:
+    report: dict[str, Any] = {
+        "stack": get_project_name(root_dir, work_dir),
+        "work_dir": work_dir,
+        "missing": False,
+        "error": None,
+        "resources": [],
+    }
+    collector = DriftCollector()
+    try:
+        # Never create stacks, missing ones are reported
+        stack = auto.select_stack(stack_name=env, work_dir=work_dir)
+        stack.preview_refresh(
+            parallel=DEFAULT_PARALLEL,
+            on_event=collector.on_event,
+            show_secrets=False,
+            suppress_progress=True,
+        )
+    except auto.StackNotFoundError:
+        report["missing"] = True
+    except auto.CommandError as e:
+        report["error"] = str(e).strip().splitlines()[-1]
+    report["resources"] = sorted(
+        collector.resources.values(), key=lambda x: x["urn"]
+    )
+    return report
+
+
+def detect_drift(
+    root_dir: str, work_dirs: list[str], env: str
+) -> list[dict[str, Any]]:
+    # Refresh previews only read from OpenStack, stacks don't depend on
+    # each other here
+    with ThreadPoolExecutor(max_workers=len(work_dirs) or 1) as pool:
+        return list(
+            pool.map(lambda x: detect_stack_drift(root_dir, x, env), work_dirs)
+        )
+
+
+def has_drift(reports: list[dict[str, Any]]) -> bool:
+    return any(x["error"] or x["resources"] for x in reports)
+
+
+def format_drift(reports: list[dict[str, Any]]) -> str:
+    lines = [
+        f"{'stack':<24} {'resource':<32} {'type':<20} {'status':<8} properties"
+    ]
+    for report in reports:
+        if not report["resources"]:
+            status = "missing" if report["missing"] else "ok"
+            if report["error"]:
+                status = f"error    {report['error']}"
+            lines.append(f"{report['stack']:<24} {'-':<32} {'-':<20} {status}")
+        for resource in report["resources"]:
+            lines.append(
+                f"{report['stack']:<24} {resource['name']:<32}"
+                f" {resource['type']:<20} {resource['status']:<8}"
+                f" {', '.join(resource['properties'])}"
+            )
+    return "\n".join(lines)
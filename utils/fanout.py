@@ -0,0 +1,153 @@
+import glob
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from typing import Callable, Iterator, TextIO
+
+from utils.plan import get_run_dir
+
+GLOB_CHARS = "*?["
+
+
+def find_envs(work_dirs: list[str]) -> set[str]:
+    result = set()
+    for work_dir in work_dirs:
+        for path in glob.glob(os.path.join(work_dir, "Pulumi.*.yaml")):
+            result.add(os.path.basename(path)[len("Pulumi.") : -len(".yaml")])
+    return result
+
+
+def expand_envs(pattern: str, known: set[str]) -> list[str]:
+    result = []
+    for item in pattern.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if any(x in item for x in GLOB_CHARS):
+            matched = sorted(x for x in known if fnmatch(x, item))
+            if not matched:
+                raise ValueError(f"No Pulumi.<env>.yaml matches {item}")
+            result.extend(matched)
+        else:
+            # Plain names may not have env config yet
+            result.append(item)
+    return list(dict.fromkeys(result))
+
+
+def get_waves(pattern: str, known: set[str], wave: bool) -> list[list[str]]:
+    if not wave:
+        return [expand_envs(pattern, known)]
+    seen: set[str] = set()
+    result = []
+    for item in pattern.split(","):
+        envs = [x for x in expand_envs(item, known) if x not in seen]
+        seen.update(envs)
+        if envs:
+            result.append(envs)
+    return result
+
+
+class EnvStream:
+    def __init__(self, env: str, console: TextIO, log: TextIO, prefix: bool):
+        self.env = env
+        self.console = console
+        self.log = log
+        self.prefix = prefix
+        self._buffer = ""
+
+    def write(self, data: str) -> int:
+        self.log.write(data)
+        if not self.prefix:
+            self.console.write(data)
+            return len(data)
+        # Whole lines only, so envs don't interleave mid line
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split("\n")
+        if lines:
+            with _console_lock:
+                for line in lines:
+                    self.console.write(f"[{self.env}] {line}\n")
+        return len(data)
+
+    def flush(self) -> None:
+        if self.prefix and self._buffer:
+            self.write("\n")
+        self.log.flush()
+        self.console.flush()
+
+
+class ThreadStdout:
+    def __init__(self, default: TextIO):
+        self.default = default
+
+    def _stream(self) -> TextIO:
+        return getattr(_local, "stream", None) or self.default
+
+    def write(self, data: str) -> int:
+        return self._stream().write(data)
+
+    def flush(self) -> None:
+        self._stream().flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self.default, name)
+
+
+_local = threading.local()
+_console_lock = threading.Lock()
+
+
+@contextmanager
+def capture_stdout() -> Iterator[None]:
+    stdout = sys.stdout
+    sys.stdout = ThreadStdout(stdout)  # type: ignore
+    try:
+        yield
+    finally:
+        sys.stdout = stdout
+
+
+@contextmanager
+def env_output(root_dir: str, env: str, prefix: bool) -> Iterator[None]:
+    log_file = os.path.join(get_run_dir(root_dir, "logs"), f"{env}.log")
+    console = sys.stdout
+    if isinstance(console, ThreadStdout):
+        console = console.default
+    with open(log_file, "a") as log:
+        _local.stream = EnvStream(env, console, log, prefix)
+        try:
+            yield
+        finally:
+            _local.stream.flush()
+            _local.stream = None
+
+
+def run_waves(
+    root_dir: str,
+    waves: list[list[str]],
+    func: Callable[[str], bool],
+    max_envs: int | None = None,
+) -> dict[str, str]:
+    multi = sum(len(x) for x in waves) > 1
+    result: dict[str, str] = {}
+
+    def run_env(env: str) -> str:
+        with env_output(root_dir, env, prefix=multi):
+            try:
+                return "succeeded" if func(env) else "failed"
+            except Exception as e:
+                print(f"{type(e).__name__}: {e}")
+                return "failed"
+
+    with capture_stdout():
+        for wave in waves:
+            if any(x == "failed" for x in result.values()):
+                result.update({env: "skipped" for env in wave})
+                continue
+            # Limit is per wave, the next wave starts once this one is done
+            with ThreadPoolExecutor(max_workers=max_envs or len(wave)) as pool:
+                result.update(zip(wave, pool.map(run_env, wave)))
+    return result
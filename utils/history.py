@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from pulumi import automation as auto
+
+from utils.plan import get_run_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stack_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    env TEXT NOT NULL,
+    stack TEXT NOT NULL,
+    action TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    status TEXT NOT NULL,
+    phases TEXT NOT NULL,
+    changes TEXT NOT NULL,
+    stats TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS stack_runs_lookup
+    ON stack_runs (env, stack, action, started_at);
+"""
+
+
+@contextmanager
+def timed(timings: dict[str, float] | None, phase: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + (
+                time.perf_counter() - start
+            )
+
+
+class StackRecord:
+    def __init__(self, stack: str, action: str):
+        self.stack = stack
+        self.action = action
+        self.started_at = time.time()
+        self.phases: dict[str, float] = {}
+        self.changes: dict[str, int] = {}
+        self.status = "failed"
+
+    def on_event(self, event: auto.EngineEvent) -> None:
+        # Last summary belongs to the main operation, refresh comes first
+        if event.summary_event:
+            self.changes = dict(event.summary_event.resource_changes or {})
+
+
+class HistoryStore:
+    def __init__(self, root_dir: str, filename: str = "history.sqlite"):
+        self.path = os.path.join(get_run_dir(root_dir), filename)
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        # Environments run in threads sharing the connection
+        self._lock = threading.Lock()
+
+    def record(
+        self, run_id: str, env: str, record: StackRecord, stats: Any
+    ) -> None:
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO stack_runs (run_id, env, stack, action,"
+                " started_at, duration, status, phases, changes, stats)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    env,
+                    record.stack,
+                    record.action,
+                    record.started_at,
+                    time.time() - record.started_at,
+                    record.status,
+                    json.dumps(record.phases),
+                    json.dumps(record.changes),
+                    json.dumps(stats or {}),
+                ),
+            )
+
+    def get_durations(
+        self, env: str, limit: int
+    ) -> dict[tuple[str, str], list[float]]:
+        rows = self.conn.execute(
+            "SELECT stack, action, duration FROM stack_runs"
+            " WHERE env = ? AND status = 'succeeded'"
+            " ORDER BY started_at DESC",
+            (env,),
+        )
+        result: dict[tuple[str, str], list[float]] = {}
+        for stack, action, duration in rows:
+            durations = result.setdefault((stack, action), [])
+            if len(durations) < limit:
+                durations.append(duration)
+        # Oldest first
+        return {k: v[::-1] for k, v in result.items()}
+
+    def find_regressions(
+        self, env: str, window: int, threshold: float
+    ) -> list[dict[str, Any]]:
+        result = []
+        for (stack, action), durations in sorted(
+            self.get_durations(env, window + 1).items()
+        ):
+            last = durations[-1]
+            previous = durations[:-1]
+            baseline = statistics.median(previous) if previous else None
+            ratio = last / baseline if baseline else None
+            result.append(
+                {
+                    "stack": stack,
+                    "action": action,
+                    "runs": len(durations),
+                    "last": last,
+                    "baseline": baseline,
+                    "ratio": ratio,
+                    "regression": bool(ratio and ratio > threshold),
+                    "trend": durations,
+                }
+            )
+        return result
+
+
+def format_regressions(rows: list[dict[str, Any]]) -> str:
+    lines = [
+        f"{'stack':<24} {'action':<8} {'runs':>4} {'last':>8}"
+        f" {'baseline':>8} {'change':>7}  trend"
+    ]
+    for row in rows:
+        baseline = f"{row['baseline']:.1f}s" if row["baseline"] else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] else "-"
+        trend = " ".join(f"{x:.0f}" for x in row["trend"])
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['stack']:<24} {row['action']:<8} {row['runs']:>4}"
+            f" {row['last']:>7.1f}s {baseline:>8} {ratio:>7}  {trend}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,69 @@
+import os
+import runpy
+import sys
+import threading
+from typing import Callable
+
+import pulumi
+from pulumi import automation as auto
+
+import utils.basic as utils
+from utils.config_helpers import CreateVM
+from utils.invoke import invoker
+from utils.metrics import metrics, set_lookup_scope
+from utils.validate import read_project_name
+
+# Programs change cwd and sys.path, only one may run at a time
+_program_lock = threading.Lock()
+# Provider config and variables choosing the cloud, project and region
+CLOUD_CONFIG = ["cloud", "authUrl", "tenantName", "tenantId", "region"]
+CLOUD_VARIABLES = [
+    "OS_CLOUD",
+    "OS_AUTH_URL",
+    "OS_PROJECT_NAME",
+    "OS_PROJECT_ID",
+    "OS_REGION_NAME",
+]
+
+
+def get_cloud_scope() -> list[str | None]:
+    config = pulumi.Config("openstack")
+    return [config.get(x) for x in CLOUD_CONFIG] + [
+        os.environ.get(x) for x in CLOUD_VARIABLES
+    ]
+
+
+def make_program(work_dir: str) -> Callable[[], None]:
+    main_file = os.path.join(work_dir, "__main__.py")
+
+    def program() -> None:
+        with _program_lock:
+            cwd = os.getcwd()
+            sys_path = list(sys.path)
+            # Lookups stay warm within one cloud and env,
+            # per stack state starts clean
+            set_lookup_scope(pulumi.get_stack(), *get_cloud_scope())
+            invoker.reset_stats()
+            metrics.reset()
+            CreateVM._stackref_outputs.clear()
+            CreateVM._configs.clear()
+            CreateVM._defaults.clear()
+            utils.read_pulumi_config.cache_clear()
+            try:
+                os.chdir(work_dir)
+                runpy.run_path(main_file, run_name="__main__")
+            finally:
+                os.chdir(cwd)
+                sys.path[:] = sys_path
+
+    return program
+
+
+def create_or_select_stack(stack_name: str, work_dir: str) -> auto.Stack:
+    return auto.create_or_select_stack(
+        stack_name=stack_name,
+        project_name=read_project_name(work_dir),
+        program=make_program(work_dir),
+        # Project settings, backend and stack config come from work dir
+        opts=auto.LocalWorkspaceOptions(work_dir=work_dir),
+    )
@@ -0,0 +1,54 @@
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(slots=True, frozen=True)
+class HostDefaults:
+    network: str
+    image: str
+    flavor: str
+
+
+@dataclass(slots=True, frozen=True)
+class HostSpec:
+    host: str
+    network: str
+    image: str
+    flavor: str
+    nat: bool = False
+    fixed_ip: str | None = None
+    boot_volume: int | None = None
+    second_iface: bool | None = None
+
+    @classmethod
+    def from_item(
+        cls, item: dict[str, Any], defaults: HostDefaults
+    ) -> "HostSpec":
+        # Names repeat across the fleet, keep one copy of each
+        return cls(
+            host=item["host"],
+            network=sys.intern(item.get("network") or defaults.network),
+            image=sys.intern(item.get("image") or defaults.image),
+            flavor=sys.intern(item.get("flavor") or defaults.flavor),
+            nat=bool(item.get("nat")),
+            fixed_ip=item.get("fixed_ip"),
+            boot_volume=item.get("boot_volume"),
+            second_iface=item.get("second_iface"),
+        )
+
+
+def parse_inventory(
+    items: list[dict[str, Any]], defaults: HostDefaults
+) -> list[HostSpec]:
+    return [HostSpec.from_item(x, defaults) for x in items]
+
+
+def get_group_hosts(group: dict[str, Any]) -> list[str]:
+    if group.get("hosts"):
+        return group["hosts"]
+    pattern = group.get("name_pattern") or "{group}-{index:02d}"
+    return [
+        pattern.format(group=group["group"], index=index)
+        for index in range(1, (group.get("count") or 0) + 1)
+    ]
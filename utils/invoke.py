@@ -0,0 +1,182 @@
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, TypeVar
+
+import pulumi
+
+from utils.throttle import STATUS_CONTEXT, THROTTLE_PATTERN
+
+T = TypeVar("T")
+
+NOT_FOUND_PATTERN = re.compile(
+    rf"{STATUS_CONTEXT} 404\b|not found|no results|returned no",
+    re.IGNORECASE,
+)
+# Retrying with the same credentials can't help
+AUTH_PATTERN = re.compile(
+    rf"{STATUS_CONTEXT} (?:401|403)\b"
+    r"|\b(?:401 Unauthorized|403 Forbidden)\b"
+    r"|requires authentication|authentication failed",
+    re.IGNORECASE,
+)
+# Lookups by name refuse to pick one of several matches
+AMBIGUOUS_PATTERN = re.compile(
+    r"more than one|multiple \w+ (?:found|matched)",
+    re.IGNORECASE,
+)
+
+
+class InvokeNotFoundError(Exception):
+    pass
+
+
+class InvokeAmbiguousError(Exception):
+    pass
+
+
+class InvokeAuthError(Exception):
+    pass
+
+
+class InvokeTransientError(Exception):
+    pass
+
+
+class CircuitOpenError(InvokeTransientError):
+    pass
+
+
+def classify_error(e: Exception) -> str:
+    message = str(e)
+    # Names may contain anything, so statuses are checked in this order
+    if AMBIGUOUS_PATTERN.search(message):
+        return "ambiguous"
+    if THROTTLE_PATTERN.search(message):
+        return "transient"
+    if AUTH_PATTERN.search(message):
+        return "auth"
+    if NOT_FOUND_PATTERN.search(message):
+        return "not_found"
+    return "transient"
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        # Half open: let a probe call through after cooldown
+        return time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class ResilientInvoker:
+    def __init__(
+        self,
+        *,
+        attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+    ):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breakers: dict[str, CircuitBreaker] = defaultdict(CircuitBreaker)
+        self.stats: dict[str, dict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int) -> float:
+        # Full jitter exponential backoff
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+
+    def count(self, endpoint: str, key: str) -> None:
+        with self._lock:
+            self.stats[endpoint][key] += 1
+
+    def invoke(
+        self,
+        endpoint: str,
+        func: Callable[..., T],
+        *args,
+        **kwargs,
+    ) -> T:
+        breaker = self.breakers[endpoint]
+
+        for attempt in range(self.attempts):
+            if not breaker.allow():
+                self.count(endpoint, "circuit_open")
+                raise CircuitOpenError(
+                    f"Circuit for {endpoint} endpoint is open,"
+                    f" {breaker.failures} consecutive failures"
+                )
+
+            self.count(endpoint, "calls")
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == "ambiguous":
+                    breaker.record_success()
+                    self.count(endpoint, kind)
+                    raise InvokeAmbiguousError(str(e)) from e
+                if kind == "auth":
+                    # Credentials, not the endpoint, are at fault
+                    self.count(endpoint, kind)
+                    raise InvokeAuthError(str(e)) from e
+                if kind == "not_found":
+                    # Endpoint is healthy, the object is just missing
+                    breaker.record_success()
+                    self.count(endpoint, kind)
+                    raise InvokeNotFoundError(str(e)) from e
+
+                breaker.record_failure()
+                self.count(endpoint, "failures")
+                if attempt == self.attempts - 1:
+                    raise InvokeTransientError(
+                        f"Invoke on {endpoint} endpoint failed after"
+                        f" {self.attempts} attempts: {e}"
+                    ) from e
+
+                self.count(endpoint, "retries")
+                delay = self.delay(attempt)
+                pulumi.log.warn(
+                    f"Invoke on {endpoint} endpoint failed: {e},"
+                    f" retry in {delay:.1f}s"
+                )
+                time.sleep(delay)
+                continue
+
+            breaker.record_success()
+            return result
+
+        raise AssertionError("unreachable")
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def get_stats(self) -> dict[str, dict[str, int]]:
+        return {k: dict(v) for k, v in self.stats.items()}
+
+
+invoker = ResilientInvoker()
@@ -0,0 +1,103 @@
+import json
+import os
+import time
+from typing import Any
+
+from utils.plan import fingerprint, get_project_name, get_run_dir
+
+
+class JournalError(Exception):
+    pass
+
+
+class RunJournal:
+    def __init__(self, root_dir: str, env: str):
+        self.root_dir = root_dir
+        self.env = env
+        self.path = os.path.join(
+            get_run_dir(root_dir, "journal"), f"{env}.json"
+        )
+        self.data: dict[str, Any] = {}
+        self.resumed_from: str | None = None
+        # project -> entry of stacks completed by the resumed run
+        self.completed: dict[str, dict[str, Any]] = {}
+        self._fingerprints: dict[str, str] = {}
+
+    def get_fingerprint(self, work_dir: str) -> str:
+        if work_dir not in self._fingerprints:
+            self._fingerprints[work_dir] = fingerprint(
+                self.root_dir, work_dir, self.env
+            )
+        return self._fingerprints[work_dir]
+
+    def get_stacks(self, work_dirs: list[str]) -> list[str]:
+        return [get_project_name(self.root_dir, x) for x in work_dirs]
+
+    def load_previous(
+        self, action: str, targets: list[str] | None, work_dirs: list[str]
+    ) -> None:
+        if not os.path.exists(self.path):
+            raise JournalError(f"No run journal of {self.env} to resume")
+        with open(self.path, "r") as f:
+            previous = json.load(f)
+
+        stacks = [x["stack"] for x in previous["stacks"]]
+        if (
+            previous["action"] != action
+            or previous.get("targets") != targets
+            or stacks != self.get_stacks(work_dirs)
+        ):
+            raise JournalError(
+                f"Run journal of {self.env} is for {previous['action']}"
+                f" of {', '.join(stacks)}, can't resume this run from it"
+            )
+        self.resumed_from = previous["run_id"]
+        self.completed = {
+            x["stack"]: x
+            for x in previous["stacks"]
+            if x["status"] == "succeeded"
+        }
+
+    def is_done(self, work_dir: str) -> bool:
+        entry = self.completed.get(get_project_name(self.root_dir, work_dir))
+        # Inputs changed since, so it has to run again
+        return entry is not None and entry[
+            "fingerprint"
+        ] == self.get_fingerprint(work_dir)
+
+    def start(
+        self,
+        run_id: str,
+        action: str,
+        targets: list[str] | None,
+        work_dirs: list[str],
+    ) -> None:
+        self.data = {
+            "run_id": run_id,
+            "resumed_from": self.resumed_from,
+            "env": self.env,
+            "action": action,
+            "targets": targets,
+            "started_at": time.time(),
+            "stacks": [
+                {"stack": stack, "status": "pending", "fingerprint": None}
+                for stack in self.get_stacks(work_dirs)
+            ],
+        }
+        self.save()
+
+    def update(self, work_dir: str, status: str) -> None:
+        project = get_project_name(self.root_dir, work_dir)
+        for entry in self.data["stacks"]:
+            if entry["stack"] == project:
+                entry["status"] = status
+                entry["fingerprint"] = self.get_fingerprint(work_dir)
+                entry["updated_at"] = time.time()
+        self.save()
+
+    def save(self) -> None:
+        # Interrupted writes must not lose the previous journal
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
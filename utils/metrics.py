@@ -0,0 +1,97 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from functools import cache, wraps
+from typing import Any, Callable
+
+# Upper bounds in seconds, the last bucket is unbounded
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+
+class LookupMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.counters: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "hits": 0, "misses": 0}
+        )
+        self.latency: dict[str, list[int]] = defaultdict(
+            lambda: [0] * (len(LATENCY_BUCKETS) + 1)
+        )
+        self.seconds: dict[str, float] = defaultdict(float)
+
+    def record(self, kind: str, hit: bool, seconds: float) -> None:
+        with self._lock:
+            counters = self.counters[kind]
+            counters["calls"] += 1
+            counters["hits" if hit else "misses"] += 1
+            if not hit:
+                # Only misses reach OpenStack
+                self.latency[kind][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+                self.seconds[kind] += seconds
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            return {
+                kind: {
+                    **counters,
+                    "seconds": round(self.seconds[kind], 3),
+                    "latency": list(self.latency[kind]),
+                }
+                for kind, counters in self.counters.items()
+            }
+
+
+metrics = LookupMetrics()
+
+# Cloud and env the lookups answer for, programs sharing one
+# interpreter must not reuse IDs of another cloud or env
+_lookup_scope: tuple[str | None, ...] = ()
+
+
+def set_lookup_scope(*scope: str | None) -> None:
+    global _lookup_scope
+    _lookup_scope = scope
+
+
+def cached_lookup(kind: str) -> Callable[[Callable], Callable]:
+    def decorator(func: Callable) -> Callable:
+        @cache
+        def cached(scope, *args, **kwargs):
+            return func(*args, **kwargs)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            hits = cached.cache_info().hits
+            start = time.perf_counter()
+            try:
+                return cached(_lookup_scope, *args, **kwargs)
+            finally:
+                metrics.record(
+                    kind,
+                    hit=cached.cache_info().hits > hits,
+                    seconds=time.perf_counter() - start,
+                )
+
+        wrapper.cache_info = cached.cache_info  # type: ignore
+        wrapper.cache_clear = cached.cache_clear  # type: ignore
+        return wrapper
+
+    return decorator
+
+
+def percentile(latency: list[int], q: float) -> str:
+    total = sum(latency)
+    if not total:
+        return "-"
+    seen = 0
+    for i, count in enumerate(latency):
+        seen += count
+        if seen >= total * q:
+            if i < len(LATENCY_BUCKETS):
+                return f"<={LATENCY_BUCKETS[i]}s"
+            return f">{LATENCY_BUCKETS[-1]}s"
+    return "-"
@@ -0,0 +1,53 @@
+import os
+from typing import Any
+
+import pulumi
+import yaml
+
+FIXTURES_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "fixtures", "validate.yaml"
+)
+
+
+def load_fixtures(filename: str = FIXTURES_FILE) -> dict[str, Any]:
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+class OfflineMocks(pulumi.runtime.Mocks):
+    def __init__(self, fixtures: dict[str, Any] | None = None):
+        fixtures = fixtures or {}
+        # token -> lookup name -> result
+        self.calls: dict[str, dict[str, Any]] = fixtures.get("calls") or {}
+        # project -> stack outputs
+        self.stack_outputs: dict[str, Any] = fixtures.get("stack_outputs") or {}
+
+    def call(self, args: pulumi.runtime.MockCallArgs):
+        name = args.args.get("name")
+        results = self.calls.get(args.token, {})
+        result = results.get(name) or results.get("*") or {}
+
+        return {
+            "id": f"{name or args.token}-id",
+            **args.args,
+            **result,
+        }, []
+
+    def new_resource(self, args: pulumi.runtime.MockResourceArgs):
+        if args.typ == "pulumi:pulumi:StackReference":
+            # org/infra.network/dev -> infra.network
+            project = args.name.split("/")[-2]
+            return args.name, {
+                "name": args.name,
+                "outputs": self.stack_outputs.get(project, {}),
+                "secretOutputNames": [],
+            }
+
+        outputs = dict(args.inputs)
+        outputs.setdefault("name", args.name)
+        # Computed address other resources refer to
+        if args.typ == "openstack:networking/floatingIp:FloatingIp":
+            outputs.setdefault("address", f"{args.name}-address")
+        return f"{args.name}-id", outputs
@@ -0,0 +1,109 @@
+import hashlib
+import os
+
+RUN_DIR = ".run"
+SHARED_DIRS = ["component", "utils"]
+SKIP_DIRS = {"__pycache__", RUN_DIR}
+
+
+def get_project_name(root_dir: str, work_dir: str) -> str:
+    return os.path.relpath(work_dir, root_dir).replace(os.sep, ".")
+
+
+def get_run_dir(root_dir: str, *parts: str) -> str:
+    path = os.path.join(root_dir, RUN_DIR, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def list_program_files(root_dir: str, work_dir: str, env: str) -> list[str]:
+    result = []
+
+    for dirpath, dirnames, filenames in os.walk(work_dir):
+        dirnames[:] = [x for x in dirnames if x not in SKIP_DIRS]
+        for filename in filenames:
+            # Only this environment's stack config is part of the program
+            if filename.startswith("Pulumi.") and filename not in {
+                "Pulumi.yaml",
+                f"Pulumi.{env}.yaml",
+            }:
+                continue
+            if filename.endswith(".pyc"):
+                continue
+            result.append(os.path.join(dirpath, filename))
+
+    for shared in SHARED_DIRS:
+        shared_dir = os.path.join(root_dir, shared)
+        for dirpath, dirnames, filenames in os.walk(shared_dir):
+            dirnames[:] = [x for x in dirnames if x not in SKIP_DIRS]
+            result.extend(
+                os.path.join(dirpath, x) for x in filenames if x.endswith(".py")
+            )
+
+    return sorted(result)
+
+
+def fingerprint(root_dir: str, work_dir: str, env: str) -> str:
+    digest = hashlib.sha256()
+    for path in list_program_files(root_dir, work_dir, env):
+        digest.update(os.path.relpath(path, root_dir).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class PlanMismatchError(Exception):
+    pass
+
+
+class PlanStore:
+    def __init__(self, root_dir: str, env: str):
+        self.root_dir = root_dir
+        self.env = env
+        self.plan_dir = get_run_dir(root_dir, "plans", env)
+        # work_dir -> fingerprint of the program being previewed
+        self.pending: dict[str, str] = {}
+
+    def plan_file(self, work_dir: str) -> str:
+        project = get_project_name(self.root_dir, work_dir)
+        return os.path.join(self.plan_dir, f"{project}.json")
+
+    def fingerprint_file(self, work_dir: str) -> str:
+        project = get_project_name(self.root_dir, work_dir)
+        return os.path.join(self.plan_dir, f"{project}.fingerprint")
+
+    def prepare(self, work_dir: str) -> str:
+        # A failed preview must not leave the previous plan to apply
+        self.discard(work_dir)
+        # Taken before preview, edits made while it runs invalidate the plan
+        self.pending[work_dir] = fingerprint(self.root_dir, work_dir, self.env)
+        return self.plan_file(work_dir)
+
+    def save(self, work_dir: str) -> None:
+        with open(self.fingerprint_file(work_dir), "w") as f:
+            f.write(self.pending.pop(work_dir))
+
+    def verify(self, work_dir: str) -> str:
+        plan_file = self.plan_file(work_dir)
+        fingerprint_file = self.fingerprint_file(work_dir)
+        if not os.path.exists(plan_file) or not os.path.exists(
+            fingerprint_file
+        ):
+            raise PlanMismatchError(
+                f"No saved plan for {work_dir}, run preview with --plan first"
+            )
+
+        with open(fingerprint_file, "r") as f:
+            saved = f.read().strip()
+        if saved != fingerprint(self.root_dir, work_dir, self.env):
+            raise PlanMismatchError(
+                f"Program or config of {work_dir} changed since preview,"
+                " refusing to apply saved plan"
+            )
+
+        return plan_file
+
+    def discard(self, work_dir: str) -> None:
+        for path in [self.plan_file(work_dir), self.fingerprint_file(work_dir)]:
+            if os.path.exists(path):
+                os.remove(path)
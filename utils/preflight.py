@@ -0,0 +1,276 @@
+import ipaddress as ip
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+
+import component
+import utils.basic as utils
+from utils.inventory import get_group_hosts
+from utils.validate import read_project_name
+
+NETWORK_PROJECT = "infra.network"
+
+
+class StrictModel(BaseModel):
+    # Typos in keys must fail instead of being silently dropped
+    model_config = ConfigDict(extra="forbid")
+
+
+def vm_field(name: str) -> tuple[Any, Any]:
+    field = component.VmConfig.model_fields[name]
+    return (field.annotation | None, None)
+
+
+class NetworkEntry(StrictModel):
+    name: str
+    cidr: str
+    network_admin_state_up: bool | None = None
+    dns: list[str] | None = None
+    dhcp: bool | None = None
+    dhcp_pool: list[str] | None = None
+    router: str | None = None
+
+    def to_vpc_config(self, default_router: str) -> component.VpcConfig:
+        params = {
+            "network_admin_state_up": self.network_admin_state_up,
+            "subnet_dns": self.dns,
+            "subnet_dhcp": self.dhcp,
+            "subnet_dhcp_pool": self.dhcp_pool,
+        }
+        return component.VpcConfig(
+            network_name=self.name,
+            subnet_cidr=self.cidr,
+            router_name=self.router or default_router,
+            **{k: v for k, v in params.items() if v is not None},
+        )
+
+
+class NetworkStack(BaseModel):
+    networks: list[NetworkEntry]
+    external_network: str
+    default_router: str
+    default_dns: list[str] | None = None
+
+
+class SgRuleEntry(StrictModel):
+    port: int
+    direction: str | None = None
+    protocol: str | None = None
+    ethertype: str | None = None
+    remote_prefix: str | None = None
+
+    def to_rule_config(self) -> component.SgRuleConfig:
+        params = {
+            "direction": self.direction,
+            "protocol": self.protocol,
+            "ethertype": self.ethertype,
+            "remote_ip_prefix": self.remote_prefix,
+        }
+        return component.SgRuleConfig(
+            name="preflight",
+            port=self.port,
+            **{k: v for k, v in params.items() if v is not None},
+        )
+
+
+class SgStack(BaseModel):
+    default_sg_rules: list[SgRuleEntry]
+    sg_rules: list[SgRuleEntry] | None = None
+    description: str | None = None
+    delete_default_rules: bool | None = None
+
+
+# Host level fields share their types with VmConfig
+InventoryHost = create_model(
+    "InventoryHost",
+    __base__=StrictModel,
+    host=(str, ...),
+    flavor=(str | None, None),
+    image=(str | None, None),
+    nat=(bool | None, None),
+    network=(str | None, None),
+    fixed_ip=vm_field("fixed_ip"),
+    boot_volume=vm_field("boot_volume"),
+    second_iface=vm_field("secondary_iface"),
+)
+
+
+VmGroupEntry = create_model(
+    "VmGroupEntry",
+    __base__=StrictModel,
+    group=(str, ...),
+    count=(int | None, None),
+    hosts=(list[str] | None, None),
+    name_pattern=(str | None, None),
+    flavor=(str | None, None),
+    image=(str | None, None),
+    nat=(bool | None, None),
+    network=(str | None, None),
+    anti_affinity=(bool | None, None),
+    server_group_policy=(str | None, None),
+    boot_volume=vm_field("boot_volume"),
+    second_iface=vm_field("secondary_iface"),
+)
+
+
+class AppStack(BaseModel):
+    inventory: list[InventoryHost]  # type: ignore
+    groups: list[VmGroupEntry] | None = None  # type: ignore
+    default_network: str
+    default_image: str
+    default_flavor: str
+    fip_pool: bool | None = None
+    base_volumes: bool | None = None
+    compress_user_data: bool | None = None
+
+
+class FipPoolStack(BaseModel):
+    external_network: str
+    size: int | None = None
+    hosts: list[str] | None = None
+
+
+class BaseVolumeImage(StrictModel):
+    name: str
+    size: int
+
+
+class VolumesStack(BaseModel):
+    images: list[BaseVolumeImage] | None = None
+    volume_type: str | None = None
+
+
+SCHEMAS: dict[str, type[BaseModel]] = {
+    "infra.network": NetworkStack,
+    "infra.sg.default": SgStack,
+    "infra.fip_pool": FipPoolStack,
+    "infra.volumes": VolumesStack,
+    "app.test": AppStack,
+}
+
+
+def load_stack(work_dir: str, env: str) -> tuple[str, dict[str, Any]]:
+    config = utils.read_stack_config(work_dir, env)
+    # Secrets can't be checked before the engine decrypts them
+    config = {
+        k: v
+        for k, v in config.items()
+        if not (isinstance(v, dict) and "secure" in v)
+    }
+    return read_project_name(work_dir), config
+
+
+def format_error(project: str, e: Exception) -> list[str]:
+    if isinstance(e, ValidationError):
+        return [
+            f"{project}: {'.'.join(str(x) for x in err['loc'])}: {err['msg']}"
+            for err in e.errors()
+        ]
+    return [f"{project}: {e}"]
+
+
+def check_stack(schema: BaseModel) -> None:
+    if isinstance(schema, NetworkStack):
+        for net in schema.networks:
+            net.to_vpc_config(schema.default_router)
+    elif isinstance(schema, SgStack):
+        for rule in [*schema.default_sg_rules, *(schema.sg_rules or [])]:
+            rule.to_rule_config()
+
+
+def check_app_networks(
+    project: str, app: AppStack, network: NetworkStack | None
+) -> list[str]:
+    if network is None:
+        return [
+            f"{project}: no valid {NETWORK_PROJECT} config to check against"
+        ]
+
+    errors = []
+    cidrs = {x.name: ip.IPv4Network(x.cidr) for x in network.networks}
+
+    hosts = [x.host for x in app.inventory]
+    used = [(x.network or app.default_network, x) for x in app.inventory]
+    for group in app.groups or []:
+        hosts.extend(get_group_hosts(group.model_dump()))
+        used.append((group.network or app.default_network, group))
+
+    for host, count in Counter(hosts).items():
+        if count > 1:
+            errors.append(f"{project}: host {host} defined {count} times")
+
+    fixed_ips = Counter()
+    for net, item in used:
+        name = getattr(item, "host", None) or getattr(item, "group")
+        if net not in cidrs:
+            errors.append(
+                f"{project}: {name} uses network {net}"
+                f" not defined in {NETWORK_PROJECT}"
+            )
+            continue
+        fixed_ip = getattr(item, "fixed_ip", None)
+        if fixed_ip:
+            fixed_ips[fixed_ip] += 1
+            try:
+                address = ip.IPv4Address(fixed_ip)
+            except ValueError:
+                errors.append(f"{project}: {name} fixed_ip {fixed_ip} invalid")
+                continue
+            if address not in cidrs[net]:
+                errors.append(
+                    f"{project}: {name} fixed_ip {fixed_ip}"
+                    f" not in {net} CIDR {cidrs[net]}"
+                )
+
+    for fixed_ip, count in fixed_ips.items():
+        if count > 1:
+            errors.append(f"{project}: fixed_ip {fixed_ip} used {count} times")
+
+    return errors
+
+
+def run_preflight(
+    all_work_dirs: list[str], work_dirs: list[str], env: str
+) -> list[str]:
+    with ThreadPoolExecutor() as pool:
+        loaded = dict(
+            zip(
+                all_work_dirs,
+                pool.map(lambda x: load_stack(x, env), all_work_dirs),
+            )
+        )
+
+    # Stacks outside of the run are checked once they have env config
+    checked = [
+        x
+        for x in all_work_dirs
+        if x in work_dirs
+        or os.path.exists(os.path.join(x, f"Pulumi.{env}.yaml"))
+    ]
+
+    errors = []
+    schemas: dict[str, BaseModel] = {}
+    for work_dir, (project, config) in loaded.items():
+        schema_cls = SCHEMAS.get(project)
+        if schema_cls is None:
+            continue
+        try:
+            schemas[project] = schema_cls.model_validate(config)
+            check_stack(schemas[project])
+        except (ValidationError, AssertionError, ValueError) as e:
+            schemas.pop(project, None)
+            if work_dir in checked:
+                errors.extend(format_error(project, e))
+
+    # Cross stack references
+    network = schemas.get(NETWORK_PROJECT)
+    for work_dir in checked:
+        project = loaded[work_dir][0]
+        app = schemas.get(project)
+        if isinstance(app, AppStack):
+            errors.extend(check_app_networks(project, app, network))  # type: ignore
+
+    return errors
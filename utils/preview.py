@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+from typing import Any
+
+from pulumi import automation as auto
+
+from utils.urns import get_name, get_type_name
+
+COUNTED_OPS = ["create", "update", "replace", "delete"]
+# Replacing these drops servers, their connectivity or their traffic
+HIGHLIGHT_TYPES = {"Instance", "RouterInterface", "SecGroupRule"}
+# Steps of one replacement reported under a single op
+REPLACE_OPS = {
+    auto.OpType.REPLACE,
+    auto.OpType.CREATE_REPLACEMENT,
+    auto.OpType.DELETE_REPLACED,
+}
+
+
+class PreviewCollector:
+    def __init__(self):
+        self.steps: dict[str, dict[str, Any]] = {}
+
+    def reset(self) -> None:
+        self.steps.clear()
+
+    def on_event(self, event: auto.EngineEvent) -> None:
+        if event.resource_pre_event is None:
+            return
+        metadata = event.resource_pre_event.metadata
+        if metadata.op in {auto.OpType.SAME, auto.OpType.READ}:
+            return
+        op = "replace" if metadata.op in REPLACE_OPS else metadata.op.value
+        self.steps[metadata.urn] = {
+            "urn": metadata.urn,
+            "name": get_name(metadata.urn),
+            "type": get_type_name(metadata.type),
+            "op": op,
+            "diffs": metadata.diffs or [],
+            "replace_keys": metadata.keys or [],
+        }
+
+
+class PreviewReport:
+    def __init__(self, env: str):
+        self.env = env
+        self.stacks: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        stack: str,
+        change_summary: dict[str, int],
+        collector: PreviewCollector,
+    ) -> None:
+        summary = {
+            getattr(op, "value", op): n for op, n in change_summary.items()
+        }
+        with self._lock:
+            self.stacks[stack] = {
+                "changes": {op: summary.get(op, 0) for op in COUNTED_OPS},
+                "change_summary": summary,
+                "steps": sorted(
+                    collector.steps.values(), key=lambda x: x["urn"]
+                ),
+            }
+
+    def get_replacements(self) -> list[dict[str, Any]]:
+        return [
+            {"stack": stack, **step}
+            for stack, report in self.stacks.items()
+            for step in report["steps"]
+            if step["op"] == "replace" and step["type"] in HIGHLIGHT_TYPES
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "env": self.env,
+                "stacks": self.stacks,
+                "replacements": self.get_replacements(),
+            }
+
+    def format_table(self) -> list[str]:
+        lines = [f"| stack | {' | '.join(COUNTED_OPS)} |"]
+        lines.append(f"|---|{'---:|' * len(COUNTED_OPS)}")
+        for stack, report in self.stacks.items():
+            counts = " | ".join(
+                str(report["changes"][op]) for op in COUNTED_OPS
+            )
+            lines.append(f"| {stack} | {counts} |")
+        return lines
+
+    def format_replacements(self) -> list[str]:
+        lines = []
+        for step in self.get_replacements():
+            keys = ", ".join(step["replace_keys"]) or "-"
+            lines.append(
+                f"- {step['stack']} {step['type']} {step['name']}: {keys}"
+            )
+        return lines
+
+    def format_markdown(self) -> str:
+        with self._lock:
+            lines = [f"# Preview of {self.env}", "", *self.format_table(), ""]
+            replacements = self.format_replacements()
+            lines.append("## Replacements")
+            lines.append("")
+            lines.extend(replacements or ["None"])
+            for stack, report in self.stacks.items():
+                if not report["steps"]:
+                    continue
+                lines.extend(["", f"## {stack}", ""])
+                for step in report["steps"]:
+                    diffs = ", ".join(step["diffs"])
+                    line = f"- {step['op']} {step['type']} {step['name']}"
+                    lines.append(f"{line}: {diffs}" if diffs else line)
+            return "\n".join(lines) + "\n"
+
+    def save(self, run_dir: str) -> tuple[str, str]:
+        json_file = os.path.join(run_dir, f"{self.env}.json")
+        with open(json_file, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        markdown_file = os.path.join(run_dir, f"{self.env}.md")
+        with open(markdown_file, "w") as f:
+            f.write(self.format_markdown())
+        return json_file, markdown_file
@@ -0,0 +1,89 @@
+import json
+from collections import defaultdict
+from typing import Any, Callable
+
+import pulumi
+
+from utils.metrics import percentile
+
+STATS_PREFIX = "run-stats "
+
+
+def log_stats(kind: str, stats: Any) -> None:
+    pulumi.log.info(STATS_PREFIX + json.dumps({"kind": kind, "stats": stats}))
+
+
+def parse_stats(message: str) -> tuple[str, Any] | None:
+    start = message.find(STATS_PREFIX)
+    if start < 0:
+        return None
+    try:
+        data = json.loads(message[start + len(STATS_PREFIX) :].strip())
+    except ValueError:
+        return None
+    return data["kind"], data["stats"]
+
+
+def chain_events(*handlers: Callable | None) -> Callable:
+    def on_event(event) -> None:
+        for handler in handlers:
+            if handler:
+                handler(event)
+
+    return on_event
+
+
+class RunSummary:
+    def __init__(self):
+        # stack -> kind -> stats reported by the stack program
+        self.stacks: dict[str, dict[str, Any]] = defaultdict(dict)
+
+    def collector(self, stack: str) -> Callable:
+        def on_event(event) -> None:
+            diagnostic = event.diagnostic_event
+            if diagnostic is None:
+                return
+            parsed = parse_stats(diagnostic.message)
+            if parsed:
+                kind, stats = parsed
+                self.stacks[stack][kind] = stats
+
+        return on_event
+
+    def get(self, stack: str, kind: str) -> Any:
+        return self.stacks.get(stack, {}).get(kind)
+
+    def format_invoke_retries(self) -> list[str]:
+        result = []
+        for stack, kinds in self.stacks.items():
+            for endpoint, stats in (kinds.get("invoke") or {}).items():
+                result.append(
+                    f"{stack}: {endpoint} calls={stats.get('calls', 0)}"
+                    f" retries={stats.get('retries', 0)}"
+                    f" failures={stats.get('failures', 0)}"
+                    f" not_found={stats.get('not_found', 0)}"
+                    f" ambiguous={stats.get('ambiguous', 0)}"
+                    f" auth={stats.get('auth', 0)}"
+                )
+        return result
+
+    def format_lookups(self) -> list[str]:
+        result = []
+        for stack, kinds in self.stacks.items():
+            for kind, stats in (kinds.get("lookups") or {}).items():
+                result.append(
+                    f"{stack}: {kind} calls={stats['calls']}"
+                    f" hits={stats['hits']} misses={stats['misses']}"
+                    f" seconds={stats['seconds']}"
+                    f" p50={percentile(stats['latency'], 0.5)}"
+                    f" p95={percentile(stats['latency'], 0.95)}"
+                )
+        return result
+
+    def print(self) -> None:
+        lines = self.format_invoke_retries() + self.format_lookups()
+        if not lines:
+            return
+        msg = "RUN SUMMARY"
+        sep = len(msg) * "-"
+        print("\n".join([sep, msg, sep, *lines]))
@@ -0,0 +1,178 @@
+import gzip
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pulumi import automation as auto
+
+from utils.plan import get_project_name
+from utils.urns import get_type_name
+
+TOP_PROPERTIES = 10
+# Base64 of the gzip magic, cloud-init config rendered with gzip
+GZIP_USER_DATA_PREFIX = "H4sI"
+
+
+def get_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def measure_checkpoint(deployment: dict[str, Any]) -> dict[str, Any]:
+    # Backends rewrite the whole checkpoint on every step
+    start = time.perf_counter()
+    text = json.dumps(deployment)
+    serialize = time.perf_counter() - start
+
+    start = time.perf_counter()
+    json.loads(text)
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    compressed = gzip.compress(text.encode())
+    compress = time.perf_counter() - start
+
+    return {
+        "bytes": len(text),
+        "gzip_bytes": len(compressed),
+        "seconds": {
+            "serialize": round(serialize, 4),
+            "parse": round(parse, 4),
+            "gzip": round(compress, 4),
+        },
+    }
+
+
+def break_down(resources: list[dict[str, Any]]) -> dict[str, Any]:
+    counts: Counter[str] = Counter()
+    type_bytes: Counter[str] = Counter()
+    property_bytes: Counter[tuple[str, str]] = Counter()
+    user_data = {"plain": 0, "plain_bytes": 0, "gzip": 0}
+    for resource in resources:
+        type_name = get_type_name(resource["type"])
+        value = (resource.get("inputs") or {}).get("userData")
+        if type_name == "Instance" and isinstance(value, str):
+            if value.startswith(GZIP_USER_DATA_PREFIX):
+                user_data["gzip"] += 1
+            else:
+                user_data["plain"] += 1
+                user_data["plain_bytes"] += len(value)
+        counts[type_name] += 1
+        type_bytes[type_name] += get_size(resource)
+        for section in ["inputs", "outputs"]:
+            for key, value in (resource.get(section) or {}).items():
+                property_bytes[(type_name, f"{section}.{key}")] += get_size(
+                    value
+                )
+
+    return {
+        "types": [
+            {"type": type_name, "count": counts[type_name], "bytes": size}
+            for type_name, size in type_bytes.most_common()
+        ],
+        "properties": [
+            {"type": type_name, "property": key, "bytes": size}
+            for (type_name, key), size in property_bytes.most_common()
+        ],
+        "user_data": user_data,
+    }
+
+
+def report_stack_state(
+    root_dir: str, work_dir: str, env: str
+) -> dict[str, Any]:
+    report: dict[str, Any] = {
+        "stack": get_project_name(root_dir, work_dir),
+        "work_dir": work_dir,
+        "missing": False,
+        "error": None,
+        "resources": 0,
+        "bytes": 0,
+        "gzip_bytes": 0,
+        "seconds": {},
+        "types": [],
+        "properties": [],
+        "user_data": {},
+    }
+    try:
+        stack = auto.select_stack(stack_name=env, work_dir=work_dir)
+        start = time.perf_counter()
+        deployment = stack.export_stack().deployment or {}
+        export = time.perf_counter() - start
+    except auto.StackNotFoundError:
+        report["missing"] = True
+        return report
+    except auto.CommandError as e:
+        report["error"] = str(e).strip().splitlines()[-1]
+        return report
+
+    resources = deployment.get("resources") or []
+    report["resources"] = len(resources)
+    report.update(measure_checkpoint(deployment))
+    report["seconds"]["export"] = round(export, 4)
+    report.update(break_down(resources))
+    return report
+
+
+def report_state(
+    root_dir: str, work_dirs: list[str], env: str
+) -> list[dict[str, Any]]:
+    # Exports only read checkpoints
+    with ThreadPoolExecutor(max_workers=len(work_dirs) or 1) as pool:
+        return list(
+            pool.map(lambda x: report_stack_state(root_dir, x, env), work_dirs)
+        )
+
+
+def format_size(size: int) -> str:
+    return f"{size / 2**10:.1f} KiB"
+
+
+def format_state(reports: list[dict[str, Any]]) -> str:
+    lines = [
+        f"{'stack':<24} {'resources':>9} {'size':>12} {'gzip':>12}"
+        f" {'export':>8} {'serialize':>9} {'parse':>8}"
+    ]
+    for report in reports:
+        if report["missing"] or report["error"]:
+            status = (
+                "missing" if report["missing"] else f"error {report['error']}"
+            )
+            lines.append(f"{report['stack']:<24} {status}")
+            continue
+        seconds = report["seconds"]
+        lines.append(
+            f"{report['stack']:<24} {report['resources']:>9}"
+            f" {format_size(report['bytes']):>12}"
+            f" {format_size(report['gzip_bytes']):>12}"
+            f" {seconds['export']:>7.2f}s {seconds['serialize']:>8.3f}s"
+            f" {seconds['parse']:>7.3f}s"
+        )
+
+    for report in reports:
+        if not report["types"]:
+            continue
+        lines.append("")
+        lines.append(f"{report['stack']}")
+        for item in report["types"]:
+            share = item["bytes"] / report["bytes"] * 100
+            lines.append(
+                f"  {item['type']:<22} {item['count']:>7}"
+                f" {format_size(item['bytes']):>12} {share:>5.1f}%"
+            )
+        for item in report["properties"][:TOP_PROPERTIES]:
+            lines.append(
+                f"  {item['type'] + ' ' + item['property']:<38}"
+                f" {format_size(item['bytes']):>12}"
+            )
+        user_data = report["user_data"]
+        if user_data.get("plain"):
+            # Nova can't change user data in place, so it stays until
+            # the instance is replaced
+            lines.append(
+                f"  {user_data['plain']} instances keep uncompressed user"
+                f" data ({format_size(user_data['plain_bytes'])}),"
+                f" {user_data['gzip']} compressed"
+            )
+    return "\n".join(lines)
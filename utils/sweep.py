@@ -0,0 +1,103 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from utils.tags import METADATA_KEY
+
+SWEEP_WORKERS = 32
+SERVER_DELETE_TIMEOUT = 600
+
+
+def has_tag(item: Any, tag: str) -> bool:
+    return tag in (getattr(item, "tags", None) or [])
+
+
+def has_metadata_tag(item: Any, tag: str) -> bool:
+    return (getattr(item, "metadata", None) or {}).get(METADATA_KEY) == tag
+
+
+def get_state_ids(stack: Any) -> set[str]:
+    resources = stack.export_stack().deployment.get("resources") or []
+    return {x["id"] for x in resources if x.get("id")}
+
+
+def find_tagged(cloud: Any, tag: str) -> dict[str, list[Any]]:
+    # Server side filters are only a hint, the tag is checked again here
+    return {
+        "servers": [
+            x for x in cloud.compute.servers(tags=tag) if has_tag(x, tag)
+        ],
+        "floating_ips": [
+            x for x in cloud.network.ips(tags=tag) if has_tag(x, tag)
+        ],
+        "volumes": [
+            x
+            for x in cloud.block_storage.volumes(details=True)
+            if has_metadata_tag(x, tag)
+        ],
+    }
+
+
+def collect(futures: dict[Future, Any], errors: list[str]) -> int:
+    deleted = 0
+    for future, item in futures.items():
+        try:
+            future.result()
+            deleted += 1
+        except Exception as e:
+            errors.append(f"{item.id}: {e}")
+    return deleted
+
+
+def sweep(
+    cloud: Any, tag: str, owned: set[str], workers: int = SWEEP_WORKERS
+) -> dict[str, Any]:
+    # Stacks of other backends may share the tag, only delete what
+    # this stack's state owns
+    tagged = find_tagged(cloud, tag)
+    found = {k: [x for x in v if x.id in owned] for k, v in tagged.items()}
+    foreign = sum(len(v) for v in tagged.values()) - sum(
+        len(v) for v in found.values()
+    )
+    errors: list[str] = []
+
+    def delete_server(server: Any) -> None:
+        cloud.compute.delete_server(server)
+        cloud.compute.wait_for_delete(server, wait=SERVER_DELETE_TIMEOUT)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Deleted floating IPs take their associations along
+        fips = {
+            pool.submit(cloud.network.delete_ip, x): x
+            for x in found["floating_ips"]
+        }
+        servers = {pool.submit(delete_server, x): x for x in found["servers"]}
+        deleted = {"servers": collect(servers, errors)}
+        # Boot volumes are in use until their servers are gone
+        volumes = {
+            pool.submit(cloud.block_storage.delete_volume, x): x
+            for x in found["volumes"]
+        }
+        deleted["floating_ips"] = collect(fips, errors)
+        deleted["volumes"] = collect(volumes, errors)
+
+    return {
+        "tag": tag,
+        "found": {k: len(v) for k, v in found.items()},
+        "deleted": deleted,
+        "foreign": foreign,
+        "errors": errors,
+    }
+
+
+def format_sweep(report: dict[str, Any]) -> str:
+    counts = ", ".join(
+        f"{kind} {report['deleted'][kind]}/{found}"
+        for kind, found in report["found"].items()
+    )
+    lines = [f"Swept {report['tag']}: {counts}"]
+    if report["foreign"]:
+        lines.append(
+            f"  left {report['foreign']} tagged resources not in stack state"
+        )
+    lines.extend(f"  {error}" for error in report["errors"])
+    return "\n".join(lines)
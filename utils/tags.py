@@ -0,0 +1,68 @@
+from typing import Any
+
+import pulumi
+
+from utils.urns import (
+    FLOATING_IP_TYPE,
+    INSTANCE_TYPE,
+    NETWORK_TYPE,
+    PORT_TYPE,
+    ROUTER_TYPE,
+    SG_TYPE,
+    SUBNET_TYPE,
+    VOLUME_TYPE,
+)
+
+TAG_PREFIX = "pulumi"
+# Nova and Neutron resources taking a list of tags
+TAGGED_TYPES = {
+    INSTANCE_TYPE,
+    NETWORK_TYPE,
+    SUBNET_TYPE,
+    ROUTER_TYPE,
+    SG_TYPE,
+    FLOATING_IP_TYPE,
+    PORT_TYPE,
+}
+# Cinder has no tags, volumes carry the tag in metadata
+METADATA_TYPES = {VOLUME_TYPE}
+METADATA_KEY = "pulumi-stack"
+
+
+def get_stack_tag(project: str, stack: str) -> str:
+    # Nova tags can't contain "/" or ","
+    return f"{TAG_PREFIX}:{project}:{stack}"
+
+
+def add_tag(
+    props: dict[str, Any], type_: str, tag: str
+) -> dict[str, Any] | None:
+    if type_ in TAGGED_TYPES:
+        tags = props.get("tags")
+        if isinstance(tags, list) and tag in tags:
+            return None
+        # Tags set as outputs are left alone
+        if tags is not None and not isinstance(tags, list):
+            return None
+        return {**props, "tags": [*(tags or []), tag]}
+    if type_ in METADATA_TYPES:
+        metadata = props.get("metadata")
+        if metadata is not None and not isinstance(metadata, dict):
+            return None
+        return {**props, "metadata": {**(metadata or {}), METADATA_KEY: tag}}
+    return None
+
+
+def register_stack_tags() -> str:
+    tag = get_stack_tag(pulumi.get_project(), pulumi.get_stack())
+
+    def transformation(
+        args: pulumi.ResourceTransformationArgs,
+    ) -> pulumi.ResourceTransformationResult | None:
+        props = add_tag(args.props, args.type_, tag)
+        if props is None:
+            return None
+        return pulumi.ResourceTransformationResult(props, args.opts)
+
+    pulumi.runtime.register_stack_transformation(transformation)
+    return tag
@@ -0,0 +1,139 @@
+from typing import Any
+
+from pulumi import automation as auto
+
+import utils.basic as utils
+from utils.inventory import get_group_hosts
+from utils.urns import (
+    FIP_ASSOCIATE_TYPE,
+    FIP_TYPE,
+    FLOATING_IP_TYPE,
+    INSTANCE_TYPE,
+    SERVER_GROUP_TYPE,
+    VM_GROUP_TYPE,
+    VM_TYPE,
+    VOLUME_TYPE,
+    get_name,
+    make_urn,
+)
+from utils.validate import read_project_name
+
+
+def get_host_names(stack: str, host: str) -> list[str]:
+    return [
+        f"{stack}-vm-{host}",
+        f"{stack}-fip-{host}",
+        f"{stack}-fip-associate-{host}",
+    ]
+
+
+def predict_host_urns(
+    stack: str, project: str, config: dict[str, Any], host: str
+) -> list[str]:
+    vm_name, fip_name, associate_name = get_host_names(stack.lower(), host)
+    inventory = {x["host"]: x for x in config.get("inventory") or []}
+    groups = config.get("groups") or []
+
+    result = []
+    if host in inventory:
+        item = inventory[host]
+        result.append(make_urn(stack, project, [VM_TYPE], vm_name))
+        result.append(
+            make_urn(stack, project, [VM_TYPE, INSTANCE_TYPE], vm_name)
+        )
+        parent_types = [VM_TYPE]
+    else:
+        for group in groups:
+            if host in get_group_hosts(group):
+                item = group
+                result.append(
+                    make_urn(
+                        stack, project, [VM_GROUP_TYPE, INSTANCE_TYPE], vm_name
+                    )
+                )
+                parent_types = [VM_GROUP_TYPE]
+                break
+        else:
+            return []
+
+    if item.get("boot_volume") and config.get("base_volumes"):
+        result.append(
+            make_urn(
+                stack, project, [*parent_types, VOLUME_TYPE], f"{vm_name}-boot"
+            )
+        )
+
+    if item.get("nat"):
+        result.append(make_urn(stack, project, [FIP_TYPE], fip_name))
+        if not config.get("fip_pool"):
+            result.append(
+                make_urn(stack, project, [FIP_TYPE, FLOATING_IP_TYPE], fip_name)
+            )
+        result.append(
+            make_urn(stack, project, [FIP_ASSOCIATE_TYPE], associate_name)
+        )
+    return result
+
+
+def predict_group_urns(
+    stack: str, project: str, config: dict[str, Any], host: str
+) -> list[str]:
+    # Shared by every member, a fresh group needs them created first
+    for group in config.get("groups") or []:
+        if host not in get_group_hosts(group):
+            continue
+        group_name = f"{stack.lower()}-vm-group-{group['group']}"
+        result = [make_urn(stack, project, [VM_GROUP_TYPE], group_name)]
+        if group.get("server_group_policy") or group.get("anti_affinity"):
+            result.append(
+                make_urn(
+                    stack,
+                    project,
+                    [VM_GROUP_TYPE, SERVER_GROUP_TYPE],
+                    f"{group_name}-server-group",
+                )
+            )
+        return result
+    return []
+
+
+def find_host_urns(
+    resources: list[dict[str, Any]], names: set[str]
+) -> list[str]:
+    result = [x["urn"] for x in resources if get_name(x["urn"]) in names]
+    # Children of selected components, state is ordered parents first
+    selected = set(result)
+    for resource in resources:
+        if (
+            resource.get("parent") in selected
+            and resource["urn"] not in selected
+        ):
+            selected.add(resource["urn"])
+            result.append(resource["urn"])
+    return result
+
+
+def resolve_targets(
+    stack: auto.Stack, work_dir: str, env: str, hosts: list[str]
+) -> tuple[list[str], list[str]]:
+    # Returns targets for the program and those already in state
+    project = read_project_name(work_dir)
+    config = utils.read_stack_config(work_dir, env)
+    resources = stack.export_stack().deployment.get("resources") or []
+    names = {x for host in hosts for x in get_host_names(env.lower(), host)}
+
+    existing = find_host_urns(resources, names)
+    predicted = [
+        urn
+        for host in hosts
+        for urn in predict_host_urns(env, project, config, host)
+    ]
+    # Targeting an existing group would update all of its members
+    in_state = {x["urn"] for x in resources}
+    predicted.extend(
+        urn
+        for host in hosts
+        for urn in predict_group_urns(env, project, config, host)
+        if urn not in in_state
+    )
+    return list(dict.fromkeys(existing + predicted)), existing
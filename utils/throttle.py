@@ -0,0 +1,129 @@
+import re
+import threading
+import time
+from typing import Callable, TypeVar
+
+from pulumi import automation as auto
+
+import utils.basic as utils
+from utils.urns import get_type_name
+
+T = TypeVar("T")
+
+# Status codes as reported by gophercloud, not any number in the message
+STATUS_CONTEXT = r"(?:but got|[Rr]equest returned|[Ss]tatus(?: code)?:?|HTTP)"
+# Conflict, rate limit and server side errors from Nova/Neutron
+THROTTLE_PATTERN = re.compile(
+    rf"{STATUS_CONTEXT} (?:409|429|5\d\d)\b"
+    r"|\b(?:409 Conflict|429 Too Many Requests|503 Service Unavailable)\b"
+    r"|Internal Server Error|\boverLimit\b|temporar(?:y|ily) overload"
+)
+DEFAULT_PARALLEL = 32
+
+
+class StackLimits:
+    def __init__(self, parallel: int, type_limits: dict[str, int]):
+        self.parallel = parallel
+        self.type_limits = type_limits
+
+    @classmethod
+    def from_config(cls, work_dir: str, env: str) -> "StackLimits":
+        config = utils.read_stack_config(work_dir, env)
+        parallel = int(config.get("parallel", DEFAULT_PARALLEL))
+        type_limits = {
+            get_type_name(k): int(v)
+            for k, v in (config.get("parallel_limits") or {}).items()
+        }
+        return cls(parallel, type_limits)
+
+    def ceiling(self, stack: auto.Stack) -> int:
+        if not self.type_limits:
+            return self.parallel
+
+        # Engine parallelism is per stack, so the strictest limit
+        # of the resource types managed by the stack wins
+        deployment = stack.export_stack().deployment or {}
+        types = {
+            get_type_name(x["type"]) for x in deployment.get("resources", [])
+        }
+        limits = [v for k, v in self.type_limits.items() if k in types]
+        if not types:
+            # New stack, nothing known yet
+            limits = list(self.type_limits.values())
+
+        return min([self.parallel, *limits])
+
+
+class AdaptiveParallelism:
+    def __init__(
+        self,
+        *,
+        floor: int = 1,
+        retries: int = 3,
+        backoff: float = 10.0,
+    ):
+        self.floor = floor
+        self.retries = retries
+        self.backoff = backoff
+        # Fraction of each stack ceiling allowed right now,
+        # shared by all stacks as they hit the same cloud
+        self.factor = 1.0
+        self._lock = threading.Lock()
+
+    def parallel(self, ceiling: int) -> int:
+        return max(self.floor, int(ceiling * self.factor))
+
+    def on_throttled(self) -> None:
+        with self._lock:
+            self.factor = max(self.factor / 2, 0.01)
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.factor = min(self.factor * 1.5, 1.0)
+
+    def run(
+        self,
+        ceiling: int,
+        operation: Callable[[int, auto.OnEvent], T],
+        retry: bool = True,
+    ) -> T:
+        attempt = 0
+        while True:
+            throttled = False
+
+            def on_event(event: auto.EngineEvent) -> None:
+                nonlocal throttled
+                if is_throttle_event(event):
+                    throttled = True
+
+            parallel = self.parallel(ceiling)
+            try:
+                result = operation(parallel, on_event)
+            except auto.CommandError:
+                if not throttled:
+                    raise
+                self.on_throttled()
+                if not retry or attempt >= self.retries:
+                    raise
+                attempt += 1
+                delay = self.backoff * 2 ** (attempt - 1)
+                print(
+                    f"OpenStack API throttled at parallel={parallel},"
+                    f" retrying in {delay:.0f}s"
+                    f" with parallel={self.parallel(ceiling)}"
+                )
+                time.sleep(delay)
+                continue
+
+            if throttled:
+                self.on_throttled()
+            else:
+                self.on_success()
+            return result
+
+
+def is_throttle_event(event: auto.EngineEvent) -> bool:
+    diagnostic = event.diagnostic_event
+    if diagnostic is None or diagnostic.severity not in {"error", "warning"}:
+        return False
+    return bool(THROTTLE_PATTERN.search(diagnostic.message))
@@ -0,0 +1,36 @@
+STACK_TYPE = "pulumi:pulumi:Stack"
+VM_TYPE = "my:modules:instance"
+VM_GROUP_TYPE = "my:modules:instance-group"
+FIP_TYPE = "my:modules:fip"
+NETWORK_TYPE = "openstack:networking/network:Network"
+SUBNET_TYPE = "openstack:networking/subnet:Subnet"
+ROUTER_TYPE = "openstack:networking/router:Router"
+ROUTER_IFACE_TYPE = "openstack:networking/routerInterface:RouterInterface"
+PORT_TYPE = "openstack:networking/port:Port"
+SG_TYPE = "openstack:networking/secGroup:SecGroup"
+SG_RULE_TYPE = "openstack:networking/secGroupRule:SecGroupRule"
+INSTANCE_TYPE = "openstack:compute/instance:Instance"
+SERVER_GROUP_TYPE = "openstack:compute/serverGroup:ServerGroup"
+KEYPAIR_TYPE = "openstack:compute/keypair:Keypair"
+FLOATING_IP_TYPE = "openstack:networking/floatingIp:FloatingIp"
+FIP_ASSOCIATE_TYPE = "openstack:compute/floatingIpAssociate:FloatingIpAssociate"
+VOLUME_TYPE = "openstack:blockstorage/volume:Volume"
+
+
+def make_urn(stack: str, project: str, types: list[str], name: str) -> str:
+    # Resources parented to the root stack have no parent type in the urn
+    return f"urn:pulumi:{stack}::{project}::{'$'.join(types)}::{name}"
+
+
+def get_name(urn: str) -> str:
+    return urn.split("::")[-1]
+
+
+def get_resource_type(urn: str) -> str:
+    # urn:pulumi:dev::app.test::my:modules:instance$openstack:...::name
+    return urn.split("::")[2].split("$")[-1]
+
+
+def get_type_name(type_token: str) -> str:
+    # openstack:compute/instance:Instance -> Instance
+    return type_token.rsplit(":", 1)[-1]
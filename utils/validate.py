@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import runpy
+import traceback
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, TypeVar
+
+import pulumi
+import yaml
+from pulumi.runtime.mocks import MockMonitor
+from pulumi.runtime.stack import run_pulumi_func
+from pydantic import ValidationError
+
+from utils.basic import get_project_config_value
+from utils.mocks import OfflineMocks, load_fixtures
+from utils.urns import INSTANCE_TYPE, get_resource_type
+
+T = TypeVar("T")
+
+
+def read_project_name(work_dir: str) -> str:
+    with open(os.path.join(work_dir, "Pulumi.yaml"), "r") as f:
+        return yaml.safe_load(f)["name"]
+
+
+def load_config(
+    project: str, work_dir: str, env: str
+) -> tuple[dict[str, str], list[str]]:
+    config = {}
+    skipped = []
+    for filename in ["Pulumi.yaml", f"Pulumi.{env}.yaml"]:
+        path = os.path.join(work_dir, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r") as f:
+            data = yaml.safe_load(f) or {}
+        for key, value in (data.get("config") or {}).items():
+            if ":" not in key:
+                key = f"{project}:{key}"
+            if isinstance(value, dict) and "secure" in value:
+                # Secrets can't be decrypted offline
+                skipped.append(key)
+                continue
+            if filename == "Pulumi.yaml":
+                value = get_project_config_value(value)
+            config[key] = value if isinstance(value, str) else json.dumps(value)
+    return config, skipped
+
+
+def classify_error(e: BaseException) -> str:
+    if isinstance(e, (pulumi.ConfigMissingError, pulumi.ConfigTypeError)):
+        return "config"
+    if isinstance(e, ValidationError):
+        return "validation"
+    if isinstance(e, AssertionError):
+        return "assertion"
+    return type(e).__name__
+
+
+def get_fixed_ips(resources: dict[str, Any]) -> list[tuple[str, str, str]]:
+    result = []
+    for urn, resource in resources.items():
+        if get_resource_type(urn) != INSTANCE_TYPE:
+            continue
+        for net in resource.state.get("networks") or []:
+            fixed_ip = net.get("fixedIpV4")
+            if fixed_ip:
+                result.append((net.get("uuid", ""), fixed_ip, urn))
+    return result
+
+
+def run_offline(
+    work_dir: str,
+    env: str,
+    monitor_cls: type[MockMonitor] = MockMonitor,
+    overrides: dict[str, Any] | None = None,
+) -> tuple[MockMonitor, list[str], list[dict[str, str]]]:
+    project = read_project_name(work_dir)
+    errors = []
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    mocks = OfflineMocks(load_fixtures())
+    monitor = monitor_cls(mocks)
+    pulumi.runtime.set_mocks(
+        mocks, project=project, stack=env, preview=True, monitor=monitor
+    )
+    config, skipped = load_config(project, work_dir, env)
+    for key, value in (overrides or {}).items():
+        config[f"{project}:{key}"] = json.dumps(value)
+    pulumi.runtime.set_all_config(config)
+
+    # Programs read files relative to their work dir
+    os.chdir(work_dir)
+    program = os.path.join(work_dir, "__main__.py")
+    try:
+        loop.run_until_complete(
+            # set_mocks already created the root stack
+            run_pulumi_func(
+                lambda: runpy.run_path(program, run_name="__main__")
+            )
+        )
+    except BaseException as e:
+        errors.append(
+            {
+                "kind": classify_error(e),
+                "message": str(e) or traceback.format_exc(limit=1),
+            }
+        )
+    return monitor, skipped, errors
+
+
+def validate_stack(
+    work_dir: str, env: str, overrides: dict[str, Any] | None = None
+) -> dict[str, Any]:
+    monitor, skipped, errors = run_offline(work_dir, env, overrides=overrides)
+    resources = monitor.get_registered_resources()
+    return {
+        "stack": read_project_name(work_dir),
+        "work_dir": work_dir,
+        "errors": errors,
+        "skipped_config": skipped,
+        "resources": {urn: get_resource_type(urn) for urn in resources},
+        "fixed_ips": get_fixed_ips(resources),
+    }
+
+
+def find_ip_conflicts(reports: list[dict[str, Any]]) -> list[str]:
+    owners: dict[tuple[str, str], list[str]] = defaultdict(list)
+    for report in reports:
+        for network, fixed_ip, urn in report["fixed_ips"]:
+            owners[(network, fixed_ip)].append(urn)
+
+    return [
+        f"{fixed_ip} on network {network} used by {', '.join(urns)}"
+        for (network, fixed_ip), urns in owners.items()
+        if len(urns) > 1
+    ]
+
+
+def run_per_stack(
+    func: Callable[[str, str], T], work_dirs: list[str], env: str
+) -> list[T]:
+    # One process per stack, Pulumi runtime settings are process global
+    with ProcessPoolExecutor(max_workers=max(len(work_dirs), 1)) as pool:
+        futures = [pool.submit(func, work_dir, env) for work_dir in work_dirs]
+        return [x.result() for x in futures]
+
+
+def validate_all(work_dirs: list[str], env: str) -> list[dict[str, Any]]:
+    return run_per_stack(validate_stack, work_dirs, env)
+
+
+def format_report(report: dict[str, Any]) -> str:
+    counts = Counter(report["resources"].values())
+    graph = ", ".join(f"{k.split(':')[-1]}: {v}" for k, v in counts.items())
+    status = "FAIL" if report["errors"] else "OK"
+    lines = [
+        f"{status} {report['stack']}: {len(report['resources'])} resources"
+        + (f" ({graph})" if graph else "")
+    ]
+    for error in report["errors"]:
+        lines.append(f"  [{error['kind']}] {error['message']}")
+    if report["skipped_config"]:
+        lines.append(
+            "  secrets not validated: " + ", ".join(report["skipped_config"])
+        )
+    return "\n".join(lines)
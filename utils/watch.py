@@ -0,0 +1,252 @@
+import ast
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import sys
+import time
+from collections import defaultdict
+from typing import Iterator
+
+import yaml
+
+from utils.plan import SHARED_DIRS, SKIP_DIRS
+
+STACKREF_PATTERN = re.compile(r"StackReference\(\s*f?[\"'][^\"']*/([\w.]+)/")
+
+# IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# | IN_CLOSE_WRITE
+INOTIFY_MASK = 0x2 | 0x40 | 0x80 | 0x100 | 0x200 | 0x8
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+def is_watched_file(path: str) -> bool:
+    filename = os.path.basename(path)
+    return filename.endswith((".py", ".yaml")) and not filename.startswith(".")
+
+
+def resolve_module(root_dir: str, module: str) -> str | None:
+    base = os.path.join(root_dir, *module.split("."))
+    for path in [f"{base}.py", os.path.join(base, "__init__.py")]:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def get_imports(root_dir: str, path: str) -> set[str]:
+    try:
+        with open(path, "r") as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError):
+        # Half saved file, it is picked up on the next change
+        return set()
+
+    package = os.path.relpath(os.path.dirname(path), root_dir).replace(
+        os.sep, "."
+    )
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(x.name for x in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split(".")
+                parts = parts[: len(parts) - node.level + 1]
+                base = ".".join([*parts, base] if base else parts)
+            modules.add(base)
+            modules.update(f"{base}.{x.name}" for x in node.names)
+
+    result = set()
+    for module in modules:
+        resolved = resolve_module(root_dir, module)
+        if resolved:
+            result.add(resolved)
+    return result
+
+
+class DependencyGraph:
+    def __init__(self, root_dir: str, work_dirs: list[str]):
+        self.root_dir = root_dir
+        self.work_dirs = work_dirs
+        # file -> stacks which are affected on its change
+        self.dependents: dict[str, set[str]] = defaultdict(set)
+        # Dependents before the last build, deleted modules are only there
+        self.previous: dict[str, set[str]] = {}
+        # stack -> stacks referencing its outputs
+        self.downstream: dict[str, set[str]] = defaultdict(set)
+        self.build()
+
+    def get_module_closure(self, path: str) -> set[str]:
+        result = set()
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            if current in result:
+                continue
+            result.add(current)
+            pending.extend(get_imports(self.root_dir, current))
+        return result
+
+    def build(self) -> None:
+        self.previous = dict(self.dependents)
+        self.dependents.clear()
+        self.downstream.clear()
+        projects = {}
+        stackrefs = {}
+
+        for work_dir in self.work_dirs:
+            with open(os.path.join(work_dir, "Pulumi.yaml"), "r") as f:
+                projects[yaml.safe_load(f)["name"]] = work_dir
+
+            main_file = os.path.join(work_dir, "__main__.py")
+            with open(main_file, "r") as f:
+                stackrefs[work_dir] = set(STACKREF_PATTERN.findall(f.read()))
+
+            for path in self.get_module_closure(main_file):
+                self.dependents[path].add(work_dir)
+            for dirpath, dirnames, filenames in os.walk(work_dir):
+                dirnames[:] = [x for x in dirnames if x not in SKIP_DIRS]
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    self.dependents[path].add(work_dir)
+
+        for work_dir, refs in stackrefs.items():
+            for project in refs:
+                upstream = projects.get(project)
+                if upstream:
+                    self.downstream[upstream].add(work_dir)
+
+    def affected(self, changed: set[str]) -> list[str]:
+        stacks = set()
+        for path in changed:
+            if path in self.dependents or path in self.previous:
+                stacks.update(self.dependents.get(path, set()))
+                stacks.update(self.previous.get(path, set()))
+            elif path.endswith(".py"):
+                # Graph is rebuilt first, so no stack imports this module
+                continue
+            else:
+                # New file in a stack dir, e.g. Pulumi.<env>.yaml
+                stacks.update(
+                    x for x in self.work_dirs if path.startswith(x + os.sep)
+                )
+
+        # Stack outputs feed the stacks referencing them
+        pending = list(stacks)
+        while pending:
+            for work_dir in self.downstream.get(pending.pop(), set()):
+                if work_dir not in stacks:
+                    stacks.add(work_dir)
+                    pending.append(work_dir)
+
+        return [x for x in self.work_dirs if x in stacks]
+
+
+def get_watch_dirs(root_dir: str, work_dirs: list[str]) -> list[str]:
+    result = []
+    for top in [*work_dirs, *(os.path.join(root_dir, x) for x in SHARED_DIRS)]:
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [x for x in dirnames if x not in SKIP_DIRS]
+            result.append(dirpath)
+    return result
+
+
+class Inotify:
+    def __init__(self, dirs: list[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.dirs: dict[int, str] = {}
+        for path in dirs:
+            wd = libc.inotify_add_watch(self.fd, path.encode(), INOTIFY_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Can't watch {path}")
+            self.dirs[wd] = path
+
+    def read(self, timeout: float | None) -> set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        result = set()
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+            path = os.path.join(self.dirs.get(wd, ""), name)
+            if is_watched_file(path):
+                result.add(path)
+        return result
+
+
+class PollWatcher:
+    def __init__(self, dirs: list[str], interval: float = 1.0):
+        self.dirs = dirs
+        self.interval = interval
+        self.mtimes = self.scan()
+
+    def scan(self) -> dict[str, float]:
+        result = {}
+        for path in self.dirs:
+            for entry in os.scandir(path):
+                if entry.is_file() and is_watched_file(entry.path):
+                    result[entry.path] = entry.stat().st_mtime
+        return result
+
+    def read(self, timeout: float | None) -> set[str]:
+        time.sleep(self.interval if timeout is None else timeout)
+        mtimes = self.scan()
+        changed = {
+            k
+            for k in mtimes.keys() | self.mtimes.keys()
+            if mtimes.get(k) != self.mtimes.get(k)
+        }
+        self.mtimes = mtimes
+        return changed
+
+
+def is_other_env(path: str, env: str) -> bool:
+    filename = os.path.basename(path)
+    return (
+        filename.startswith("Pulumi.")
+        and filename != "Pulumi.yaml"
+        and filename != f"Pulumi.{env}.yaml"
+    )
+
+
+def watch(
+    root_dir: str, work_dirs: list[str], env: str, debounce: float = 0.5
+) -> Iterator[list[str]]:
+    graph = DependencyGraph(root_dir, work_dirs)
+    dirs = get_watch_dirs(root_dir, work_dirs)
+    if sys.platform.startswith("linux"):
+        watcher = Inotify(dirs)
+    else:
+        watcher = PollWatcher(dirs)
+
+    while True:
+        changed = watcher.read(None)
+        # Collect a burst of saves into one run
+        while changed:
+            more = watcher.read(debounce)
+            if not more:
+                break
+            changed |= more
+
+        changed = {x for x in changed if not is_other_env(x, env)}
+        if not changed:
+            continue
+
+        # Imports and stack references may have changed as well
+        graph.build()
+        stacks = graph.affected(changed)
+        if stacks:
+            yield stacks